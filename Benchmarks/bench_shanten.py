@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:05:44 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Benchmark for Util.Shanten. Deals random hands from a full wall and times how
+many hands a second get their shanten worked out, first with empty suit
+tables and then again once the tables are filled.
+
+Run from the repo root: python Benchmarks/bench_shanten.py [hands]
+"""
+import sys
+import time
+from synth import deal_hands
+from Util.HandModel import parse
+from Util.Shanten import shanten, _tables
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    hands = [parse(h) for h in deal_hands(n)]
+    for label in ("cold tables", "warm tables"):
+        start = time.perf_counter()
+        for hand in hands:
+            shanten(hand)
+        # end for
+        took = time.perf_counter() - start
+        print("{}: {} hands in {:.3f}s, {:,.0f} hands/s ({} suit patterns)"
+              .format(label, n, took, n/took, len(_tables)))
+    # end for
+#end if
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:26:49 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Times each stage of loading, showing and saving hands over synthetic
+histories of several sizes, and writes the timings out as JSON.
+
+    python Benchmarks/run_benchmarks.py [--sizes 100 1000 ...] [--out FILE]
+                                        [--compare OLD.json]
+
+Stages needing Tk run under a withdrawn root window, so they need a display
+(an offscreen one such as Xvfb works). Without one they're skipped and noted
+in the results. With --compare, any stage more than --tolerance times slower
+than in the old results is reported and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from synth import synth_hands
+from Util.HandStore import (ArchiveStore, JsonStore, JournalStore, ShardStore,
+                            SqliteStore)
+
+SIZES = (100, 1000, 10000, 100000)
+CLASSIC_MAX = 2000  # Biggest size to time the one-frame-per-hand viewer at
+ADDS = 50           # Hands added when timing add_hand
+
+'''
+Collects timings as a list of {"stage", "size", "seconds"} dicts.
+'''
+class Timings:
+    def __init__(self):
+        self.results = []
+    
+    '''
+    Time a function call, recording it under stage and size. Returns what the
+    function returned.
+    '''
+    def time(self, stage, size, func, *args):
+        start = time.perf_counter()
+        res = func(*args)
+        took = time.perf_counter() - start
+        self.results.append({"stage": stage, "size": size, "seconds": took})
+        print("{:<36} {:>7} {:>10.4f}s".format(stage, size, took))
+        return res
+    # end def
+# end class
+
+# Write hands out as a JSON save, for the stores to read back in
+def write_save(path, hands):
+    store = JsonStore(path)
+    store.extend(hands)
+    store.save(lambda: hands)
+# end def
+
+'''
+Time the stages that don't need Tk: reading and writing each store.
+'''
+def bench_storage(timings, hands, folder):
+    size = len(hands)
+    path = os.path.join(folder, "hands_{}.json".format(size))
+    write_save(path, hands)
+    
+    def json_load():
+        with open(path, 'r') as f:
+            return json.load(f)
+    # end def
+    
+    timings.time("json.load", size, json_load)
+    timings.time("JsonStore.load", size, JsonStore(path).load)
+    timings.time("JsonStore.pages (first)", size,
+                 lambda: next(JsonStore(path).pages(200), []))
+    # Saves are skipped when nothing was added, so mark the stores dirty
+    store = JsonStore(path)
+    store.dirty = True
+    timings.time("JsonStore.save", size, store.save, lambda: hands)
+    journal = JournalStore(path)
+    timings.time("JournalStore.load", size, journal.load)
+    timings.time("JournalStore.add", size, journal.add, hands[0])
+    timings.time("JournalStore.save", size, journal.save, lambda: hands)
+    timings.time("JournalStore.compact", size, journal.compact, hands)
+    db = SqliteStore(os.path.join(folder, "hands_{}.db".format(size)))
+    timings.time("SqliteStore.extend", size, db.extend, hands)
+    timings.time("SqliteStore.load", size, db.load)
+    timings.time("SqliteStore.pages (first)", size,
+                 lambda: next(db.pages(200), []))
+    db.close()
+    archive = ArchiveStore(os.path.join(folder, "hands_{}.mja".format(size)))
+    archive.dirty = True
+    timings.time("ArchiveStore.save", size, archive.save, lambda: hands)
+    timings.time("ArchiveStore.load", size, archive.load)
+    timings.time("ArchiveStore.pages (first)", size,
+                 lambda: next(archive.pages(200), []))
+    shards = ShardStore(os.path.join(folder, "hands_{}.shards".format(size)))
+    timings.time("ShardStore.migrate_json", size, shards.migrate_json, path)
+    shards.add(hands[0])
+    timings.time("ShardStore.save", size, shards.save, lambda: hands)
+    timings.time("ShardStore.load", size, shards.load)
+    timings.time("ShardStore.load_parallel", size, shards.load_parallel)
+    timings.time("ShardStore.pages (first)", size,
+                 lambda: next(shards.pages(200), []))
+# end def
+
+'''
+Time the stages that need Tk, under the given (withdrawn) root.
+'''
+def bench_tk(timings, hands, root, folder):
+    from Util.HandViewer import HandViewer
+    from Util.HandCanvas import HandCanvas
+    from Util.HandFrame import HandFrame
+    from Util.tilePngs import TileProvider
+    from mahjongtracker import MahjongTracker
+    size = len(hands)
+    tiles = TileProvider(10)
+    
+    def import_hands(viewer):
+        viewer.import_hands(hands, tiles)
+        root.update_idletasks()
+    # end def
+    
+    def add_hands(viewer):
+        for hand in hands[:ADDS]:
+            viewer.add_hand(hand, tiles)
+        # end for
+        root.update_idletasks()
+    # end def
+    
+    viewers = [("virtual HandCanvas", dict(virtual=True, backend=HandCanvas))]
+    if size <= CLASSIC_MAX:
+        viewers.append(("classic HandFrame", dict(backend=HandFrame)))
+    # end if
+    for name, kw in viewers:
+        viewer = HandViewer(root, 'gray66', **kw)
+        viewer.get_outer().grid(row=0, column=0, sticky='news')
+        timings.time("import_hands " + name, size, import_hands, viewer)
+        timings.time("add_hand x{} {}".format(ADDS, name), size, add_hands,
+                     viewer)
+        timings.time("export_hands " + name, size, viewer.export_hands)
+        viewer.get_outer().destroy()
+    # end for
+    
+    # The app itself, through its own load and save
+    path = os.path.join(folder, "app_{}.json".format(size))
+    write_save(path, hands)
+    app = MahjongTracker(root, tiles, JsonStore(path))
+    
+    # Both run on the app's task thread, so wait for them to finish
+    def load_hands():
+        app._load_hands()
+        app.tasks.wait()
+    # end def
+    
+    def save_hands():
+        app.store.dirty = True  # Time the full rewrite, not the skipped one
+        app._save_hands()
+        app.tasks.wait()
+    # end def
+    
+    timings.time("MahjongTracker._load_hands", size, load_hands)
+    timings.time("MahjongTracker._save_hands", size, save_hands)
+    app.tasks.shutdown()
+    for child in list(root.children.values()):
+        child.destroy()
+    # end for
+# end def
+
+'''
+Time loading the tile graphics, with an empty atlas cache and then a warm one.
+'''
+def bench_tiles(timings, folder):
+    import Util.tilePngs as tilePngs
+    cache = tilePngs.CACHE
+    tilePngs.CACHE = os.path.join(folder, "Cache")
+    try:
+        timings.time("gen_img_table (cold cache)", 0, tilePngs.gen_img_table, 10)
+        timings.time("gen_img_table (warm cache)", 0, tilePngs.gen_img_table, 10)
+    finally:
+        tilePngs.CACHE = cache
+    # end try
+# end def
+
+'''
+Check results against older ones. Returns a list of lines describing each
+stage that got more than tolerance times slower.
+'''
+def compare(results, old, tolerance):
+    before = {(r["stage"], r["size"]): r["seconds"] for r in old["results"]}
+    res = []
+    for r in results:
+        prev = before.get((r["stage"], r["size"]))
+        # Very quick stages are mostly noise, so leave those be
+        if prev and r["seconds"] > 0.001 and r["seconds"] > prev*tolerance:
+            res.append("{} at {}: {:.4f}s, was {:.4f}s".format(
+                       r["stage"], r["size"], r["seconds"], prev))
+        # end if
+    # end for
+    return res
+# end def
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument("--sizes", type=int, nargs='+', default=SIZES)
+    parser.add_argument("--out", help="file to write JSON results to")
+    parser.add_argument("--compare", help="older JSON results to check against")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+    # Tile graphics are found relative to the repo root
+    os.chdir(ROOT)
+    
+    timings = Timings()
+    root = None
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+    except Exception as e:
+        print("No display, skipping Tk stages ({}).".format(e))
+    # end try
+    with tempfile.TemporaryDirectory() as folder:
+        if root is not None:
+            bench_tiles(timings, folder)
+        for size in args.sizes:
+            hands = timings.time("synth_hands", size, synth_hands, size)
+            bench_storage(timings, hands, folder)
+            if root is not None:
+                bench_tk(timings, hands, root, folder)
+        # end for
+    # end with
+    if root is not None:
+        root.destroy()
+    
+    output = {"meta": {"python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "tk": root is not None},
+              "results": timings.results}
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(output, f, indent=4)
+        # end with
+    else:
+        print(json.dumps(output))
+    # end if
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            slower = compare(timings.results, json.load(f), args.tolerance)
+        for line in slower:
+            print("Slower: " + line)
+        # end for
+        return 1 if slower else 0
+    # end if
+    return 0
+# end def
+
+if __name__ == "__main__":
+    sys.exit(main())
+#end if
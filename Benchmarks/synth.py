@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 18:02:11 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Synthetic hand histories for the benchmarks. Hands follow the same JSON
+template as HandFrame and are dealt from a seeded wall, so a given size and
+seed always gives the same history.
+"""
+import os
+import random
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Util.HandModel import SUITS
+from Util.Shanten import shanten
+
+YAKU = ("riichi", "tanyao", "pinfu", "yakuhai", "chiitoitsu", "honitsu",
+        "toitoi", "sanshoku", "ittsu", "chanta")
+WHERE = ("wall", "dead wall", "opponent's hand", "discarded", "riichi'd on")
+
+'''
+Write tile indices out as MPSZ notation, grouped by suit in index order.
+'''
+def to_mpsz(tiles):
+    tiles = sorted(tiles)
+    return ''.join(SUITS[s] + ''.join(str(t % 9 + 1) for t in tiles
+                                      if t//9 == s)
+                   for s in range(4) if any(t//9 == s for t in tiles))
+# end def
+
+'''
+Deal n random closed hands of size tiles as MPSZ strings, from a seeded wall.
+'''
+def deal_hands(n, size=13, seed=0):
+    rng = random.Random(seed)
+    wall = [i for i in range(34) for _ in range(4)]
+    return [to_mpsz(rng.sample(wall, size)) for _ in range(n)]
+# end def
+
+'''
+Make a history of n hands. Around a quarter are won, a few are in furiten,
+and some have a called triplet. Shanten is worked out for real; accepts are
+just a couple of plausible tiles, as real ukeire would make generating a big
+history slow.
+'''
+def synth_hands(n, seed=0):
+    rng = random.Random(seed)
+    wall = [i for i in range(34) for _ in range(4)]
+    res = []
+    for _ in range(n):
+        tiles = rng.sample(wall, 18)
+        start = to_mpsz(tiles[:14])
+        if rng.random() < 0.3:
+            # Call a triplet of a tile not already in the closed hand
+            pon = next(t for t in range(34) if t not in tiles[4:14])
+            hand = to_mpsz(tiles[4:14]) + ' ' + to_mpsz([pon]*3)
+        else:
+            hand = to_mpsz(tiles[4:17])
+        # end if
+        won = rng.random() < 0.25
+        res.append({
+            "hand": hand,
+            "dora": to_mpsz(tiles[17:]),
+            "shanten": shanten(hand),
+            "accepts": to_mpsz(rng.sample(range(34), rng.randint(1, 3))),
+            "yaku": rng.choice(YAKU),
+            "furiten": int(rng.random() < 0.05),
+            "won": int(won),
+            "rtn": rng.choice("rt") if won else rng.choice("nh"),
+            "left": rng.randint(0, 69),
+            "where": rng.choice(WHERE),
+            "start": start,
+        })
+    # end for
+    return res
+# end def
@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 22:14:52 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Compact binary archive of hands for long histories. Every hand takes the same
+number of bytes, so hand N is at a known offset and can be read straight out
+of a memory map without touching the ones before it.
+
+Layout, all little endian:
+    Header      magic, version, record size, hand count, and where the value
+                table starts and how many values it holds
+    Records     RECORD per hand, oldest first
+    Values      Offsets then the text of each value, as JSON
+
+Hand, dora and start are written one byte per tile (a tile index, a red five,
+a face-down tile or a call separator), and accepts as a 34 bit mask. Won and
+furiten are bits of the flags, and the yaku, rtn and where text is stored once
+in the value table and referred to by its number. Anything that wouldn't come
+back out exactly the same way, like a hand that isn't valid MPSZ or a won
+saved as "true", goes in the value table instead with a flag set for it.
+"""
+import json
+import mmap
+import os
+import struct
+from Util.HandModel import (HandRecord, MpszError, SUITS,
+                            TILE_COUNT, parse, parse_flag, read_tiles, to_mpsz)
+
+MAGIC = b"MJTA"
+VERSION = 2
+# Versions that can still be read, 1 never sets RAW_FLAGS
+READABLE = (1, 2)
+HEADER = struct.Struct("<4sHHIQI")
+# flags, rtn, shanten, left, yaku, where, hand, dora, accepts, start
+RECORD = struct.Struct("<HHiiII24s10sQ16s2x")
+# Tile codes past the 34 tile indices
+RED = TILE_COUNT        # Red fives, plus 0-2 for m/p/s
+BACK = TILE_COUNT + 3   # Face-down tile, b1
+SPACE = TILE_COUNT + 4  # Separator before a call
+PAD = 0xFF              # Unused byte after the tiles
+# Flag bits
+WON = 1 << 0
+FURITEN = 1 << 1
+# Bit set when a field is in the value table rather than packed
+RAW = {"hand": 1 << 2, "dora": 1 << 3, "accepts": 1 << 4, "start": 1 << 5,
+       "shanten": 1 << 6, "left": 1 << 7}
+# Bit set when won or furiten isn't a plain int 0 or 1, which has the where
+# value hold [where, won, furiten] to give them back as they were
+RAW_FLAGS = 1 << 8
+# Bytes for each field packed as tiles
+WIDTHS = {"hand": 24, "dora": 10, "start": 16}
+# (suit, digit) of each tile code, and the other way around
+TILES = {i: (SUITS[i//9], str(i % 9 + 1)) for i in range(TILE_COUNT)}
+TILES.update({RED + i: (SUITS[i], '0') for i in range(3)})
+TILES[BACK] = ('b', '1')
+CODES = {tile: code for code, tile in TILES.items()}
+
+'''
+Read only view of an archive. Works as a sequence of HandRecords, decoding a
+hand only when it's asked for. Use it in a with block, or close it when done.
+'''
+class HandArchive:
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0,
+                                 access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(path + " is empty, not an archive")
+        # end try
+        magic, version, size, self.count, table, values = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version not in READABLE or size != RECORD.size:
+            self.close()
+            raise ValueError(path + " isn't a version {} hand archive".format(
+                                                                    VERSION))
+        # end if
+        # The value table is small, so it's all read in up front
+        offsets = struct.unpack_from("<{}I".format(values + 1), self.map,
+                                     table)
+        start = table + 4*(values + 1)
+        self.values = [json.loads(self.map[start + a:start + b])
+                       for a, b in zip(offsets, offsets[1:])]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("hand index out of range")
+        return self.__decode(RECORD.unpack_from(self.map,
+                                                HEADER.size + i*RECORD.size))
+    # end def
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+    # end def
+
+    # Turn an unpacked record back into a HandRecord
+    def __decode(self, fields):
+        (flags, rtn, shanten, left, yaku, where, hand, dora, accepts,
+         start) = fields
+        values = self.values
+        data = {"won": int(bool(flags & WON)),
+                "furiten": int(bool(flags & FURITEN)),
+                "rtn": values[rtn], "yaku": values[yaku],
+                "where": values[where], "shanten": shanten, "left": left,
+                "accepts": accepts, "hand": hand, "dora": dora,
+                "start": start}
+        if flags & RAW_FLAGS:
+            data["where"], data["won"], data["furiten"] = values[where]
+        # end if
+        for key, bit in RAW.items():
+            if flags & bit:
+                data[key] = values[_slot_index(data[key])]
+            elif key in WIDTHS:
+                data[key] = decode_tiles(data[key])
+            elif key == "accepts":
+                data[key] = to_mpsz([(accepts >> i) & 1
+                                     for i in range(TILE_COUNT)])
+            # end if
+        # end for
+        return HandRecord(*[data[key] for key in HandRecord.__slots__])
+    # end def
+# end class
+
+'''
+Write a list of hands (JSON dicts or HandRecords) as an archive. Goes by way
+of a temp file, so the old archive is only replaced once the new one is done.
+'''
+def write_archive(path, hands):
+    values = {}     # JSON text of each value -> its number
+
+    def value(obj):
+        return values.setdefault(json.dumps(obj), len(values))
+    # end def
+
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    count = 0
+    with open(path + ".tmp", 'wb') as f:
+        f.write(bytes(HEADER.size))
+        for hand in hands:
+            f.write(_encode(hand, value))
+            count += 1
+        # end for
+        table = f.tell()
+        texts = [text.encode() for text in values]
+        offsets = [0]
+        for text in texts:
+            offsets.append(offsets[-1] + len(text))
+        # end for
+        f.write(struct.pack("<{}I".format(len(offsets)), *offsets))
+        f.write(b"".join(texts))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, count, table,
+                            len(texts)))
+        f.flush()
+        os.fsync(f.fileno())
+    # end with
+    os.replace(path + ".tmp", path)
+# end def
+
+'''
+Every hand in an archive as JSON dicts, oldest first.
+'''
+def read_archive(path):
+    with HandArchive(path) as archive:
+        return [hand.to_dict() for hand in archive]
+    # end with
+# end def
+
+'''
+Convert a JSON list of hands, in the saved_hands.json schema, to an archive.
+'''
+def json_to_archive(src, dst):
+    with open(src, 'r') as f:
+        text = f.read()
+    # end with
+    write_archive(dst, json.loads(text) if text.strip() else [])
+# end def
+
+'''
+Convert an archive back to a pretty printed JSON list of hands.
+'''
+def archive_to_json(src, dst):
+    hands = read_archive(src)
+    with open(dst + ".tmp", 'w') as f:
+        json.dump(hands, f, indent=4)
+    # end with
+    os.replace(dst + ".tmp", dst)
+# end def
+
+'''
+Pack a MPSZ string as one byte per tile, padded out to width. Gives None if
+the tiles don't fit, there's one without a code, or the string wouldn't come
+back out the same.
+'''
+def encode_tiles(string, width):
+    if not isinstance(string, str):
+        return None
+    codes = [SPACE if tile is None else CODES.get(tile)
+             for tile in read_tiles(string)]
+    if None in codes or len(codes) > width:
+        return None
+    packed = bytes(codes) + bytes([PAD])*(width - len(codes))
+    return packed if decode_tiles(packed) == string else None
+# end def
+
+'''
+Unpack tiles packed by encode_tiles back into a MPSZ string.
+'''
+def decode_tiles(packed):
+    res = ''; suit = None
+    for code in packed:
+        if code == PAD:
+            break
+        if code == SPACE:
+            res += ' '; suit = None
+            continue
+        # end if
+        s, d = TILES[code]
+        if s != suit:
+            res += s; suit = s
+        res += d
+    # end for
+    return res
+# end def
+
+# Pack one hand into a record, adding its text to the value table
+def _encode(hand, value):
+    flags = 0
+    if parse_flag(hand["won"]) == 1:
+        flags |= WON
+    if parse_flag(hand["furiten"]) == 1:
+        flags |= FURITEN
+    where = hand["where"]
+    if any(type(hand[key]) is not int or hand[key] not in (0, 1)
+           for key in ("won", "furiten")):
+        flags |= RAW_FLAGS
+        where = [where, hand["won"], hand["furiten"]]
+    # end if
+    packed = {}
+    for key in WIDTHS:
+        packed[key] = encode_tiles(hand[key], WIDTHS[key])
+    # end for
+    packed["accepts"] = _accepts_mask(hand["accepts"])
+    for key in ("shanten", "left"):
+        # Must fit in an int32 and come back as the same int
+        val = hand[key]
+        ok = type(val) is int and -2**31 <= val < 2**31
+        packed[key] = val if ok else None
+    # end for
+    for key, bit in RAW.items():
+        if packed[key] is None:
+            flags |= bit
+            slot = value(hand[key])
+            packed[key] = (slot if key in ("accepts", "shanten", "left")
+                           else struct.pack("<I", slot))
+        # end if
+    # end for
+    return RECORD.pack(flags, value(hand["rtn"]), packed["shanten"],
+                       packed["left"], value(hand["yaku"]),
+                       value(where), packed["hand"], packed["dora"],
+                       packed["accepts"], packed["start"])
+# end def
+
+# Accepts as a bit per tile, or None if that wouldn't give the string back
+def _accepts_mask(string):
+    if not isinstance(string, str):
+        return None
+    try:
+        counts = parse(string).counts
+    except MpszError:
+        return None
+    # end try
+    if max(counts) > 1 or to_mpsz(counts) != string:
+        return None
+    return sum(1 << i for i, c in enumerate(counts) if c)
+# end def
+
+# Value number kept in a raw field's slot, which is an int or packed bytes
+def _slot_index(slot):
+    if isinstance(slot, bytes):
+        return struct.unpack_from("<I", slot)[0]
+    return slot
+# end def
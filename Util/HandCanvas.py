@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 10:12:31 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Canvas backed version of HandFrame. Rather than a Label per tile, the whole
+hand is drawn as images on a single Canvas, so each hand only costs one
+widget. Keeps the HandFrame API so the viewer can use either one.
+"""
+import tkinter as tk
+from Util.HandFrame import HandFrame
+from Util.HandModel import read_tiles
+from Util.Instrument import timed
+
+class HandCanvas(HandFrame):
+    def __init__(self, master, handData, images, bg, bd=0, relief='solid'):
+        # Load the Basics
+        self.images = images    # Tile PNGs
+        self.bg = bg            # BG Color
+        self.bd = bd            # Border width, tiles are drawn inside of it
+        # Own tkinter canvas, standing in for HandFrame's frame
+        self.frame = tk.Canvas(master, bg=bg, bd=bd, relief=relief,
+                               highlightthickness=0)
+        self.labels = []        # No labels, tiles are drawn on the canvas
+        self.onClick = None     # Called with the record when clicked on
+        
+        # Read in the hand and do arrangements
+        self.load(handData)
+        
+    '''
+    Read a MPSZ notation string into its list of tiles. The tiles are only
+    turned into images when the hand is drawn.
+    Input: String in MPSZ notation
+    Output: List of (suit, digit) tuples, None for spacers
+    '''
+    def _read_hand(self, input):
+        return read_tiles(input)
+    
+    # Draw the tiles of the hand onto the canvas, left to right
+    @timed("view.arrange_hand")
+    def _arrange_hand(self):
+        # Hold onto the drawn images so the tile LRU can't drop them
+        self.shown = draw_tiles(self.frame, self.hand, self.images, self.bd)
+    # end def
+# end class
+
+'''
+Draw a list of tiles from read_tiles onto a canvas, left to right, sizing the
+canvas to fit them. Anything already on the canvas is cleared first. Returns
+the images drawn, which the caller has to hold onto for as long as they're
+shown.
+'''
+def draw_tiles(canvas, tiles, images, bd=0):
+    canvas.delete('all')
+    shown = []
+    x = bd; height = 0
+    for tile in tiles:
+        # Spacer for called tiles is half a tile wide
+        if tile is None:
+            x += width//2 if height else 0
+            continue
+        # end if
+        img = images[tile[0]][tile[1]]
+        canvas.create_image(x, bd, image=img, anchor='nw')
+        shown.append(img)
+        width = img.width()
+        height = max(height, img.height())
+        x += width
+    # end for
+    canvas.configure(width=x - bd, height=height)
+    return shown
+# end def
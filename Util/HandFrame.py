@@ -4,11 +4,13 @@ Created on Sun Aug 2 15:19:45 2024
 
 @author: Giovanni "Veirya" Oliver
 
-Class to represent a frame for a particular mahjong hand. The handData keys
-in init also serves as the template for json data for a given hand.
+Class to represent a frame for a particular mahjong hand. The hand's data is
+kept as a HandModel.HandRecord, whose fields are the template for the json
+data of a given hand.
 """
 import tkinter as tk
-import re
+from Util.HandModel import read_tiles, to_record
+from Util.Instrument import timed
 
 class HandFrame:
     def __init__(self, master, handData, images, bg, bd=0, relief='solid'):
@@ -16,44 +18,59 @@ class HandFrame:
         self.images = images    # Tile PNGs
         self.bg = bg            # BG Color
         self.frame = tk.Frame(master, bg=bg, bd=bd, relief=relief)  # Own tkinter frame
-        self.rawHand = handData["hand"]     # MPSZ notation string for hand
-        self.hand = self._read_hand(self.rawHand)   # Labels for hand
-        self.rawDora = handData["dora"]     # MPSZ notation string for doras
-        self.dora = self._read_hand(self.rawDora)   # Labels for doras
-        self.shanten = handData["shanten"]  # Shanten of hand
-        self.accepts = handData["accepts"]  # Tiles that reduce shanten 
-        self.yaku = handData["yaku"]    # Main Yaku intended for hand
-        self.furiten = handData["furiten"]  # In Furiten?
-        self.won = handData["won"]  # Did you win the hand?
-        self.rtn = handData["rtn"]  # Ron/Tsumo/Neither
-        self.left = handData["left"]    # How many tiles left in the wall
-        self.where = handData["where"]  # Where was what you needed (tenpai)
-        self.start = handData["start"]  # Dealt hand + first draw
+        self.labels = []        # Every label made by this frame, for reuse
+        self.used = 0           # Number of labels in use for current hand
+        self.onClick = None     # Called with the record when clicked on
         
-        # Then do arrangements
-        self._arrange_hand()
+        # Read in the hand and do arrangements
+        self.load(handData)
         
     def get_frame(self):
         return self.frame
     
+    '''
+    Load a hand's data (a HandRecord or JSON dict) into the frame, reusing the
+    labels already made by it. Lets a viewer recycle a frame for a different
+    hand instead of building a new one.
+    '''
+    def load(self, handData):
+        self.used = 0
+        self.record = to_record(handData)   # Data of the hand shown
+        self.hand = self._read_hand(self.record.hand)   # Labels for hand
+        self.dora = self._read_hand(self.record.dora)   # Labels for doras
+        self._arrange_hand()
+    # end def
+    
+    '''
+    Swap the tile images used by the frame, such as for a new zoom level, and
+    redo the hand with them.
+    '''
+    def set_images(self, images):
+        self.images = images
+        self.used = 0
+        self.hand = self._read_hand(self.record.hand)
+        self.dora = self._read_hand(self.record.dora)
+        self._arrange_hand()
+    # end def
+    
+    '''
+    Call a function with the record of the hand shown whenever the frame or
+    one of its tiles is clicked. The frame may get reused for another hand,
+    so the record is only looked up at the time of the click.
+    '''
+    def bind_click(self, callback):
+        self.onClick = callback
+        self.frame.bind('<Button-1>', self._on_click)
+        for label in self.labels:
+            label.bind('<Button-1>', self._on_click)
+        # end for
+    # end def
+    
     '''
     Back out the hand's data for JSON packaging
     '''
     def get_data(self):
-        data = {}
-        data["hand"] = self.rawHand
-        data["dora"] = self.rawDora
-        data["shanten"] = self.shanten
-        data["accepts"] = self.accepts
-        data["yaku"] = self.yaku
-        data["furiten"] = self.furiten
-        data["won"] = self.won
-        data["rtn"] = self.won
-        data["left"] = self.left
-        data["where"] = self.where
-        data["start"] = self.start
-        
-        return data
+        return self.record.to_dict()
     # end def
     
     '''
@@ -65,31 +82,53 @@ class HandFrame:
     '''
     def _read_hand(self, input):
         res = []
-        matches = re.findall(r'[mpszb][0-9]*| ', input)
-        for mtch in matches:
+        for tile in read_tiles(input):
+            label = self._next_label()
             # Spacer for called tiles
-            if mtch == ' ':
-                label = tk.Label(self.frame, width=5)
-                label.configure(background=self.bg)
-                res.append(label)
+            if tile is None:
+                label.configure(image='', width=5)
+                label.image = None
             else:
-                for d in mtch[1:]:
-                    # Assign the label's image according to tile
-                    img = self.images[mtch[0]][d]
-                    label = tk.Label(self.frame, image=img)
-                    label.configure(background=self.bg)
-                    res.append(label)
-                # end for
+                # Assign the label's image according to tile. The label holds
+                # onto it so it can't be dropped by the tile LRU while shown.
+                label.image = self.images[tile[0]][tile[1]]
+                label.configure(image=label.image, width=0)
             # end if
+            res.append(label)
         # end for
         return res
     # end def
     
+    '''
+    Get the next unused label of the frame, only making a new one when all of
+    the existing labels are already in use.
+    '''
+    def _next_label(self):
+        if self.used == len(self.labels):
+            label = tk.Label(self.frame)
+            label.configure(background=self.bg)
+            if self.onClick is not None:
+                label.bind('<Button-1>', self._on_click)
+            self.labels.append(label)
+        # end if
+        self.used += 1
+        return self.labels[self.used - 1]
+    # end def
+    
+    # Click binding, hands the current record on to the callback
+    def _on_click(self, event):
+        self.onClick(self.record)
+    
     # Arrange the parts of the hand in the frame
+    @timed("view.arrange_hand")
     def _arrange_hand(self):
         # Arrange the labels according to position in list
         for i, label in enumerate(self.hand):
             label.grid(row=0, column = i, columnspan = 1)
         # end for
+        # Hide anything left over from a previously loaded hand
+        for label in self.labels[len(self.hand):]:
+            label.grid_forget()
+        # end for
     # end def
 # end class
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 21:26:44 2026
+
+@author: Giovanni "Veirya" Oliver
+
+In memory inverted index over the loaded hands, for filtering them without
+going through every hand. Each term (a wait, a yaku, won/lost...) maps to the
+set of hands that have it, so a filter is a handful of set intersections.
+"""
+import re
+from collections import defaultdict
+from functools import lru_cache
+from Util.HandModel import (MpszError, SUITS, TILE_COUNT, hand_hash, parse,
+                            parse_flag, read_tiles, tile_index)
+
+# Words a query can use for the won and rtn terms
+WON_WORDS = {'won': 1, 'win': 1, 'lost': 0, 'loss': 0}
+RTN_WORDS = {'r': 'ron', 'ron': 'ron', 't': 'tsumo', 'tsumo': 'tsumo',
+             'h': 'hit', 'hit': 'hit', 'n': 'na', 'na': 'na', 'n/a': 'na'}
+# Tile written number first, like 3p, which gets flipped to p3
+_NUMBER_FIRST = re.compile(r'^([0-9]+)([mpsz])$')
+# Shanten term, like shanten:1 or shanten:0-2
+_SHANTEN = re.compile(r'^shanten:(-?[0-9]+)(?:-(-?[0-9]+))?$')
+
+'''
+Raised for a query term that can't be understood.
+'''
+class QueryError(ValueError):
+    pass
+
+'''
+Index of hands by their terms. Hands are numbered in display order: appended
+hands get the next number after the newest, prepended hands the next number
+before the oldest, so a hand's place in the list is its number minus first.
+
+Queries are terms split by spaces or commas, all of which a hand needs to
+match:
+    won, lost           Whether the hand was won
+    ron, tsumo, hit, na How the hand ended (short codes work too)
+    furiten             Hand was furiten
+    shanten:N[-M]       Shanten entered for the hand, or a range of it
+    has:MPSZ            Final hand holds every one of these tiles
+    wait:MPSZ, MPSZ     Hand accepts any of these tiles. A bare tile (p3 or
+                        3p) is a wait, and every wait in a query is combined,
+                        so "p3 p6" is the same as "wait:p36".
+    anything else       A word of the yaku
+Any term can start with - to leave out the hands that match it.
+'''
+class HandIndex:
+    def __init__(self):
+        self.clear()
+
+    '''
+    Forget every hand.
+    '''
+    def clear(self):
+        self.first = 0      # Number of the oldest hand
+        self.size = 0       # Number of hands indexed
+        self.terms = defaultdict(set)   # Term -> numbers of hands with it
+        self.hashes = set()     # hand_hash of every hand, to spot duplicates
+        # Tile terms are looked up by tile index, as there are a lot of them
+        self.tiles = {'has': [set() for _ in range(TILE_COUNT)],
+                      'wait': [set() for _ in range(TILE_COUNT)]}
+    # end def
+
+    '''
+    Index a hand placed after the newest one.
+    '''
+    def add(self, hand):
+        self.__index(self.first + self.size, hand)
+        self.size += 1
+    # end def
+
+    def extend(self, hands):
+        for hand in hands:
+            self.add(hand)
+        # end for
+    # end def
+
+    '''
+    Index a list of hands, oldest first, placed before the oldest one.
+    '''
+    def prepend(self, hands):
+        for hand in reversed(hands):
+            self.first -= 1
+            self.size += 1
+            self.__index(self.first, hand)
+        # end for
+    # end def
+
+    '''
+    Is a hand with the same content as this one indexed?
+    '''
+    def has_hand(self, hand):
+        return hand_hash(hand) in self.hashes
+    
+    '''
+    Places in the list of the hands matching a query, in order. An empty
+    query matches everything. Raises QueryError for a term it doesn't get.
+    '''
+    def query(self, text):
+        keep = None; drop = set(); waits = None
+        for term in re.split(r'[\s,]+', text.lower().strip()):
+            if not term:
+                continue
+            negate = term.startswith('-')
+            found = self.__lookup(term.lstrip('-'))
+            if found is None:
+                raise QueryError("Don't know the term '{}'".format(term))
+            kind, hands = found
+            if negate:
+                drop |= hands
+            elif kind == 'wait':
+                waits = hands if waits is None else waits | hands
+            else:
+                keep = hands if keep is None else keep & hands
+            # end if
+        # end for
+        if waits is not None:
+            keep = waits if keep is None else keep & waits
+        # end if
+        if keep is None:
+            keep = range(self.first, self.first + self.size)
+        # end if
+        return sorted(n - self.first for n in keep if n not in drop)
+    # end def
+
+    # The (kind, set of hands) a single term matches, or None
+    def __lookup(self, term):
+        if term in WON_WORDS:
+            return 'won', self.terms[('won', WON_WORDS[term])]
+        if term in RTN_WORDS:
+            return 'rtn', self.terms[('rtn', RTN_WORDS[term])]
+        if term == 'furiten':
+            return 'furiten', self.terms[('furiten', 1)]
+        match = _SHANTEN.match(term)
+        if match:
+            lo = int(match.group(1))
+            hi = int(match.group(2) or lo)
+            hands = set()
+            for (kind, value), found in self.terms.items():
+                if kind == 'shanten' and lo <= value <= hi:
+                    hands |= found
+                # end if
+            # end for
+            return 'shanten', hands
+        # end if
+        kind, colon, tiles = term.rpartition(':')
+        if colon and kind not in ('wait', 'has'):
+            return None
+        kind = kind or 'wait'
+        try:
+            counts = parse(_NUMBER_FIRST.sub(r'\2\1', tiles)).counts
+        except MpszError:
+            # Not tiles, so a yaku unless it was meant to be tiles
+            return None if colon else ('yaku', self.terms[('yaku', term)])
+        # end try
+        hands = None
+        for idx, count in enumerate(counts):
+            if count:
+                found = self.tiles[kind][idx]
+                if hands is None:
+                    hands = set(found)
+                elif kind == 'wait':
+                    hands |= found
+                else:
+                    hands &= found
+                # end if
+            # end if
+        # end for
+        return kind, hands or set()
+    # end def
+
+    # Add a hand's terms under its number
+    def __index(self, n, hand):
+        self.hashes.add(hand_hash(hand))
+        terms = self.terms
+        won = parse_flag(hand.get("won"))
+        if won is not None:
+            terms[('won', won)].add(n)
+        if parse_flag(hand.get("furiten")):
+            terms[('furiten', 1)].add(n)
+        rtn = RTN_WORDS.get(str(hand.get("rtn", '')).strip().lower())
+        if rtn is not None:
+            terms[('rtn', rtn)].add(n)
+        try:
+            terms[('shanten', int(hand.get("shanten")))].add(n)
+        except (TypeError, ValueError):
+            pass
+        # end try
+        for word in re.split(r'[\s,]+', str(hand.get("yaku", '')).lower()):
+            if word:
+                terms[('yaku', word)].add(n)
+            # end if
+        # end for
+        for kind, key in (('has', "hand"), ('wait', "accepts")):
+            tiles = self.tiles[kind]
+            for idx in _tile_set(str(hand.get(key, '')).lower()):
+                tiles[idx].add(n)
+            # end for
+        # end for
+    # end def
+# end class
+
+# Indices of the distinct tiles in a MPSZ string, read leniently like the
+# viewer does for hands that don't parse
+@lru_cache(maxsize=1 << 16)
+def _tile_set(string):
+    try:
+        counts = parse(string).counts
+    except MpszError:
+        return tuple(sorted({tile_index(*tile) for tile in read_tiles(string)
+                             if tile is not None and tile[0] in SUITS}))
+    # end try
+    return tuple(i for i, c in enumerate(counts) if c)
+# end def
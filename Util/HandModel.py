@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 13:40:08 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Core model of a hand written in MPSZ notation, shared by the display, input
+checking and hand analysis so a string only ever gets parsed once.
+
+Notation is a suit letter followed by the digits of its tiles, e.g. 'm123p55'.
+Tiles are indexed 0-33: 1-9m, 1-9p, 1-9s then the 7 honors (1-7z). A 0 is a
+red five. Called tiles come after the closed hand, each call separated by a
+space, and face-down tiles from Kan are written as 'b1'.
+"""
+import hashlib
+import sys
+from functools import lru_cache
+
+SUITS = 'mpsz'      # Suit letters in tile index order
+TILE_COUNT = 34     # Number of distinct tiles
+# Lowest and highest digit allowed for each letter, only m/p/s have red fives
+MIN_DIGIT = {'m': '0', 'p': '0', 's': '0', 'z': '1', 'b': '1'}
+MAX_DIGIT = {'m': '9', 'p': '9', 's': '9', 'z': '7', 'b': '1'}
+# Keys of a hand's data, in the order HandFrame lays them out
+FIELDS = ("hand", "dora", "shanten", "accepts", "yaku", "furiten", "won", "rtn",
+          "left", "where", "start")
+# Ways of entering Ron/Tsumo/Hit/NA, full and short
+RTN_CODES = {'r', 'ron', 't', 'tsumo', 'h', 'hit', 'n', 'na', 'n/a'}
+
+'''
+Raised for a string that isn't valid MPSZ notation. pos is the index in the
+string where the problem was found.
+'''
+class MpszError(ValueError):
+    def __init__(self, msg, pos):
+        super().__init__("{} at position {}".format(msg, pos))
+        self.msg = msg
+        self.pos = pos
+# end class
+
+'''
+A parsed hand. Parses are cached and shared, so treat these as read only.
+    tiles:  (suit, digit) tuple for each tile in the order written, with None
+            for each space between calls. What the display draws.
+    counts: 34 slot count of every face up tile, closed and called.
+    closed: 34 slot count of just the closed tiles, before the first space.
+    calls:  Tuple of the tile indices in each call.
+    red:    Number of red fives in each of m, p and s.
+    backs:  Number of face-down tiles.
+'''
+class Hand:
+    __slots__ = ('text', 'tiles', 'counts', 'closed', 'calls', 'red', 'backs')
+    
+    def __init__(self, text, tiles, counts, closed, calls, red, backs):
+        self.text = text
+        self.tiles = tiles
+        self.counts = counts
+        self.closed = closed
+        self.calls = calls
+        self.red = red
+        self.backs = backs
+    
+    def __repr__(self):
+        return "Hand({!r})".format(self.text)
+    
+    '''
+    Number of face up tiles in the hand.
+    '''
+    def size(self):
+        return sum(self.counts)
+# end class
+
+# Index of a tile from its suit letter and digit, red fives being fives
+def tile_index(suit, digit):
+    return SUITS.index(suit)*9 + (int(digit) or 5) - 1
+
+# Suit letter and digit of a tile index
+def tile_name(index):
+    return SUITS[index//9], str(index % 9 + 1)
+
+'''
+Write out the tiles in a 34 slot count as MPSZ notation, in index order.
+'''
+def to_mpsz(counts):
+    res = ''
+    for s, suit in enumerate(SUITS):
+        digits = ''.join(str(i + 1)*counts[s*9 + i] for i in range(9)
+                         if s*9 + i < TILE_COUNT)
+        if digits:
+            res += suit + digits
+        # end if
+    # end for
+    return res
+# end def
+
+'''
+Parse a MPSZ notation string into a Hand, raising MpszError if it's invalid.
+Strict about everything: each letter needs digits after it, each digit must
+be a real tile for its suit, calls can't be empty and no tile can show up
+more than 4 times.
+'''
+@lru_cache(maxsize=1 << 16)
+def parse(string):
+    if not string:
+        raise MpszError("Empty hand", 0)
+    tiles = []; counts = [0]*TILE_COUNT; red = [0, 0, 0]; backs = 0
+    groups = [[]]   # Tile indices of the closed hand then each call
+    suit = None     # Letter the current digits belong to
+    for i, c in enumerate(string):
+        if c == ' ':
+            if suit is not None and string[i - 1].isalpha():
+                raise MpszError("No tiles after '{}'".format(suit), i - 1)
+            if not groups[-1] and not (tiles and tiles[-1]):
+                raise MpszError("Empty call", i)
+            tiles.append(None); groups.append([]); suit = None
+        elif c in MAX_DIGIT:
+            if suit is not None and string[i - 1].isalpha():
+                raise MpszError("No tiles after '{}'".format(suit), i - 1)
+            suit = c
+        elif c.isdigit() and c.isascii():
+            if suit is None:
+                raise MpszError("Tile without a suit", i)
+            if not MIN_DIGIT[suit] <= c <= MAX_DIGIT[suit]:
+                raise MpszError("No such tile {}{}".format(suit, c), i)
+            tiles.append((suit, c))
+            if suit == 'b':
+                backs += 1
+                continue
+            # end if
+            idx = tile_index(suit, c)
+            counts[idx] += 1
+            if counts[idx] > 4:
+                raise MpszError("More than 4 of {}{}".format(suit, c), i)
+            if c == '0':
+                red[SUITS.index(suit)] += 1
+            groups[-1].append(idx)
+        else:
+            raise MpszError("Unexpected '{}'".format(c), i)
+        # end if
+    # end for
+    if string[-1].isalpha():
+        raise MpszError("No tiles after '{}'".format(suit), len(string) - 1)
+    if string[-1] == ' ':
+        raise MpszError("Empty call", len(string) - 1)
+    closed = [0]*TILE_COUNT
+    for idx in groups[0]:
+        closed[idx] += 1
+    # end for
+    return Hand(string, tuple(tiles), bytes(counts), bytes(closed),
+                tuple(tuple(g) for g in groups[1:]), tuple(red), backs)
+# end def
+
+'''
+Get the problem with a MPSZ notation string, as a MpszError, or None if it's
+valid.
+'''
+def mpsz_error(string):
+    try:
+        parse(string)
+    except MpszError as e:
+        return e
+    # end try
+    return None
+# end def
+
+'''
+Get the tiles of a MPSZ notation string to draw, in the order written. Each
+tile is a (suit, digit) tuple, with None standing in for the spaces that
+separate called tiles. Saved hands that don't pass parse() are still drawn
+as best as possible, skipping anything that isn't a tile.
+'''
+@lru_cache(maxsize=1 << 16)
+def read_tiles(string):
+    try:
+        return parse(string).tiles
+    except MpszError:
+        pass
+    # end try
+    res = []; suit = None
+    for c in string:
+        if c == ' ':
+            res.append(None); suit = None
+        elif c in MAX_DIGIT:
+            suit = c
+        elif suit is not None and MIN_DIGIT[suit] <= c <= MAX_DIGIT[suit]:
+            res.append((suit, c))
+        # end if
+    # end for
+    return tuple(res)
+# end def
+
+'''
+Read a won or furiten value, which may have been saved as 1/0, "1"/"0" or
+"true"/"false". Gives 1 or 0, or None for anything else.
+'''
+def parse_flag(value):
+    value = str(value).strip().lower()
+    if value in ('1', 'true'):
+        return 1
+    if value in ('0', 'false'):
+        return 0
+    return None
+# end def
+
+'''
+Check one field of a hand's data, following the same rules as the input
+section. Returns the value cleaned up the way the input section saves it
+(text lowercased and stripped, numbers as ints), or raises ValueError saying
+what's wrong.
+'''
+def check_field(key, value):
+    if key in ("furiten", "won"):
+        flag = parse_flag(value)
+        if flag is None:
+            raise ValueError("{} should be 0 or 1".format(key))
+        return flag
+    elif key in ("shanten", "left"):
+        # Negative is valid for shanten, but not checked for left
+        try:
+            return int(str(value).strip())
+        except ValueError:
+            raise ValueError("{} should be a whole number".format(key))
+        # end try
+    # end if
+    value = str(value).lower().strip()
+    if not value:
+        raise ValueError("{} is empty".format(key))
+    if key in ("hand", "dora", "accepts", "start"):
+        parse(value)
+        if key == "dora" and ' ' in value:
+            raise ValueError("dora can't have calls")
+    elif key == "rtn" and value not in RTN_CODES:
+        raise ValueError("rtn should be one of " + ", ".join(sorted(RTN_CODES)))
+    # end if
+    return value
+# end def
+
+'''
+Check every field of a hand's data with check_field. Returns the cleaned up
+hand with its keys in order, or raises ValueError for the first bad field.
+'''
+def check_hand(data):
+    res = {}
+    for key in FIELDS:
+        if key not in data:
+            raise ValueError("{} is missing".format(key))
+        try:
+            res[key] = check_field(key, data[key])
+        except MpszError as e:
+            raise ValueError("{}: {}".format(key, e))
+        # end try
+    # end for
+    return res
+# end def
+
+'''
+Stable hash of a hand's content as a hex string, for spotting duplicates and
+keying per-hand caches. Fields are compared the way they'd be saved, so 1
+and "1" or "Riichi " and "riichi" hash the same.
+'''
+def hand_hash(data):
+    parts = []
+    for key in FIELDS:
+        value = str(data.get(key, '')).strip().lower()
+        if key in ("furiten", "won") and parse_flag(value) is not None:
+            value = str(parse_flag(value))
+        # end if
+        parts.append(value)
+    # end for
+    return hashlib.blake2b("\x1f".join(parts).encode(),
+                           digest_size=16).hexdigest()
+# end def
+
+'''
+One saved hand, the compact in memory form of its JSON data. Only holds the
+eleven fields, with the text that repeats between hands (yaku, rtn, where)
+interned so hands share a single copy of it. Fields can also be read as
+record["hand"] or record.get("hand"), so code written for the JSON dicts
+works with either.
+'''
+class HandRecord:
+    __slots__ = FIELDS
+    
+    def __init__(self, hand, dora, shanten, accepts, yaku, furiten, won, rtn,
+                 left, where, start):
+        self.hand = hand            # MPSZ notation string for hand
+        self.dora = dora            # MPSZ notation string for doras
+        self.shanten = shanten      # Shanten of hand
+        self.accepts = accepts      # Tiles that reduce shanten
+        self.yaku = _intern(yaku)   # Main Yaku intended for hand
+        self.furiten = furiten      # In Furiten?
+        self.won = won              # Did you win the hand?
+        self.rtn = _intern(rtn)     # Ron/Tsumo/Neither
+        self.left = left            # How many tiles left in the wall
+        self.where = _intern(where) # Where was what you needed (tenpai)
+        self.start = start          # Dealt hand + first draw
+    
+    def __getitem__(self, key):
+        if key not in _FIELD_SET:
+            raise KeyError(key)
+        return getattr(self, key)
+    # end def
+    
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _FIELD_SET else default
+    
+    '''
+    Back out the hand's data for JSON packaging.
+    '''
+    def to_dict(self):
+        return {"hand": self.hand, "dora": self.dora, "shanten": self.shanten,
+                "accepts": self.accepts, "yaku": self.yaku,
+                "furiten": self.furiten, "won": self.won, "rtn": self.rtn,
+                "left": self.left, "where": self.where, "start": self.start}
+    # end def
+# end class
+
+_FIELD_SET = frozenset(FIELDS)
+
+'''
+Get a hand's data as a HandRecord, converting it if it's a JSON dict. Raises
+KeyError if a field is missing.
+'''
+def to_record(data):
+    if type(data) is HandRecord:
+        return data
+    return HandRecord(*[data[key] for key in FIELDS])
+# end def
+
+# Intern text so equal values share one string
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
@@ -0,0 +1,876 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:02:17 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Classes for the ways saved hands can be kept on disk. The app only talks to
+a HandStore, so the format behind it can be swapped out.
+"""
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import os
+import re
+import sqlite3
+import time
+from Util.HandArchive import HandArchive, read_archive, write_archive
+from Util.HandModel import FIELDS
+from Util.Instrument import timed, record
+
+# Name of the shard for hands saved before sharding
+LEGACY = "legacy"
+# File name of a shard, the legacy one or a YYYY-MM month
+_SHARD_FILE = re.compile(r'^(legacy|[0-9]{4}-[0-9]{2})\.json$')
+
+'''
+Base for the hand stores. Hands go in and out as lists of hand data dicts,
+the same JSON template HandFrame uses.
+'''
+class HandStore:
+    def __init__(self, path):
+        self.path = path    # Main save file of the store
+        self.dirty = False  # Added to since the last save?
+    
+    '''
+    Read every saved hand, oldest first.
+    '''
+    def load(self):
+        raise NotImplementedError
+    
+    '''
+    Read every saved hand like load, spreading the reading over a pool of
+    worker processes for stores split across files. Stores in one file just
+    load.
+    '''
+    def load_parallel(self, workers=None):
+        return self.load()
+    
+    '''
+    Read the saved hands a page of at most size hands at a time, starting
+    with the newest page. Hands within a page are oldest first. Stores that
+    can read from the end of their save do so without loading the rest.
+    '''
+    def pages(self, size):
+        hands = self.load()
+        return _paginate(reversed(hands), size)
+    
+    '''
+    Note a hand that was just added to the app. Stores that write hands one
+    at a time do it here, the rest mark themselves dirty until the next save.
+    '''
+    def add(self, hand):
+        self.dirty = True
+    
+    '''
+    Note a batch of hands added at once, such as from a bulk import.
+    '''
+    def extend(self, hands):
+        for hand in hands:
+            self.add(hand)
+        # end for
+    # end def
+    
+    '''
+    Make sure everything added so far is saved. Takes a function returning
+    all of the app's hands, only called by stores that need the full list.
+    '''
+    def save(self, export):
+        raise NotImplementedError
+    
+    '''
+    Will the next save need the full list of hands? Lets the app skip
+    gathering them up when the store won't use them.
+    '''
+    def needs_export(self):
+        return True
+    
+    '''
+    Let go of any open files or connections.
+    '''
+    def close(self):
+        pass
+    
+    # Make sure the folder the save file goes in exists
+    def _make_dir(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+    # end def
+# end class
+
+'''
+The original format, a single pretty printed JSON list of every hand that gets
+rewritten in full on every save.
+'''
+class JsonStore(HandStore):
+    def load(self):
+        try:
+            return _read_json(self.path)
+        except FileNotFoundError:
+            self._make_dir()
+            open(self.path, 'w').close()
+            print("Save file not found. Intialized save file and directory.")
+            return []
+        # end try
+    # end def
+    
+    def pages(self, size):
+        if not os.path.exists(self.path):
+            # Sets up the empty save, which has no pages
+            return _paginate(reversed(self.load()), size)
+        return _paginate(_scan_json_backward(self.path), size)
+    # end def
+    
+    def save(self, export):
+        # Nothing new since the last write, so the file is already right
+        if not self.dirty:
+            return
+        self._make_dir()
+        _write_json(self.path, export())
+        self.dirty = False
+    # end def
+    
+    def needs_export(self):
+        return self.dirty
+# end class
+
+'''
+Keeps the JSON list as a snapshot, plus a JSON Lines journal next to it that
+new hands are appended to one line at a time. Saving only has to make sure
+the journal is on disk, so it takes the same time however many hands there
+are. Once the journal has compactAt hands in it, the next save folds it back
+into the snapshot.
+
+The journal starts with a header line. Before a compaction swaps in the new
+snapshot, it puts a hash of that snapshot in the header as "folded". If the
+compaction is cut off, the next open compares the hash with the snapshot on
+disk: if they match, the new snapshot made it into place with the journal in
+it, so the journal gets skipped. Otherwise the journal still counts. Other
+writers of the snapshot, like a JsonStore on the same file, can't change
+whether the journal counts, as only a cut off compaction sets folded.
+'''
+class JournalStore(HandStore):
+    def __init__(self, path, compactAt=1000):
+        super().__init__(path)
+        self.journal = os.path.splitext(path)[0] + ".jsonl"
+        self.compactAt = compactAt  # Journal length that triggers compaction
+        self.pending = 0            # Hands in the journal
+    
+    def load(self):
+        try:
+            hands = _read_json(self.path)
+        except FileNotFoundError:
+            hands = []
+        # end try
+        return hands + self._open_journal()
+    # end def
+    
+    def pages(self, size):
+        journal = self._open_journal()
+        older = []
+        if os.path.exists(self.path):
+            older = _scan_json_backward(self.path)
+        # end if
+        return _paginate(itertools.chain(reversed(journal), older), size)
+    # end def
+    
+    @timed("store.journal_add")
+    def add(self, hand):
+        self._append([hand])
+    
+    def extend(self, hands):
+        self._append(hands)
+    
+    def save(self, export):
+        if self.needs_export():
+            self.compact(export())
+        # end if
+    # end def
+    
+    def needs_export(self):
+        return self.pending >= self.compactAt
+    
+    '''
+    Rewrite the snapshot with the given hands and empty out the journal. Both
+    files are swapped in whole, so a crash leaves either the old or new one.
+    '''
+    def compact(self, hands):
+        self._make_dir()
+        text = json.dumps(hands, indent=4).encode()
+        # Note what the new snapshot will be before swapping it in, so a cut
+        # off compaction can tell whether it got that far
+        header, journal = self._read_journal()
+        self._write_header(journal, _digest(text))
+        _write_text(self.path, text)
+        self._write_header()
+        self.pending = 0
+    # end def
+    
+    '''
+    Read the hands in the journal that aren't in the snapshot yet, starting
+    a new journal if there isn't one.
+    '''
+    def _open_journal(self):
+        self._make_dir()
+        header, journal = self._read_journal()
+        if header is None:
+            # Keeps any hands from a journal that lost its header
+            self._write_header(journal)
+        elif header.get("folded") is not None:
+            # A compaction was cut off. If its snapshot is the one on disk,
+            # the journal is already in it.
+            if header["folded"] == self._snapshot_digest():
+                journal = []
+            self._write_header(journal)
+        # end if
+        self.pending = len(journal)
+        return journal
+    # end def
+    
+    '''
+    Read the journal as (header, list of hands). Only lines ending in a
+    newline were written in full. A last line without one was cut off by a
+    crash, so it's dropped and trimmed off the end of the file, and a line
+    that can't be read anywhere else is skipped without losing the hands
+    after it. Gives (None, []) if there's no journal, and a None header if
+    the first line isn't one.
+    '''
+    def _read_journal(self):
+        header = None; hands = []; good = 0; bad = 0
+        try:
+            with open(self.journal, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        bad += 1; good += len(line)
+                        continue
+                    # end try
+                    if not good and _is_header(record):
+                        header = record
+                    else:
+                        hands.append(record)
+                    # end if
+                    good += len(line)
+                # end for
+            # end with
+        except FileNotFoundError:
+            return None, []
+        # end try
+        if bad:
+            print("Skipped {} unreadable line(s) in {}.".format(
+                                                        bad, self.journal))
+        # end if
+        if os.path.getsize(self.journal) > good:
+            print("Dropped an incomplete hand from " + self.journal + ".")
+            os.truncate(self.journal, good)
+        # end if
+        return header, hands
+    # end def
+    
+    # Hash of the snapshot file, None if there isn't one yet
+    def _snapshot_digest(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return _digest(f.read())
+            # end with
+        except FileNotFoundError:
+            return None
+        # end try
+    # end def
+    
+    # Append hands to the journal, each on its own line. A write cut off
+    # earlier can leave the file without a final newline, so one goes in
+    # first to keep the new hands off that broken line.
+    def _append(self, hands):
+        self._start_journal()
+        with open(self.journal, 'rb+') as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+            # end if
+            for hand in hands:
+                f.write(json.dumps(hand).encode() + b"\n")
+                self.pending += 1
+            # end for
+            f.flush()
+            os.fsync(f.fileno())
+        # end with
+    # end def
+    
+    # Make sure there's a journal with a header to append hands to
+    def _start_journal(self):
+        if not os.path.exists(self.journal):
+            self._make_dir()
+            self._write_header()
+        # end if
+    # end def
+    
+    # Swap in a journal with the header line, followed by any given hands.
+    # folded is the hash of a snapshot about to be swapped in by compact.
+    def _write_header(self, hands=(), folded=None):
+        with open(self.journal + ".tmp", 'w') as f:
+            f.write(json.dumps({"folded": folded}) + "\n")
+            for hand in hands:
+                f.write(json.dumps(hand) + "\n")
+            # end for
+            f.flush()
+            os.fsync(f.fileno())
+        # end with
+        os.replace(self.journal + ".tmp", self.journal)
+    # end def
+# end class
+
+'''
+Keeps the hands in a binary HandArchive. Every hand is the same size, so a
+page is read straight out of a memory map at the end of the file without the
+rest. Like JsonStore, saving rewrites the whole file, and is skipped when
+nothing was added.
+'''
+class ArchiveStore(HandStore):
+    @timed("store.archive_load")
+    def load(self):
+        if not os.path.exists(self.path):
+            return []
+        return read_archive(self.path)
+    # end def
+    
+    def pages(self, size):
+        if not os.path.exists(self.path):
+            return
+        with HandArchive(self.path) as archive:
+            count = len(archive)
+        # end with
+        # Hands are only ever added after these, so their places don't change.
+        # The archive is opened per page rather than held open, as a save
+        # replaces the file.
+        for stop in range(count, 0, -size):
+            start = time.perf_counter()
+            with HandArchive(self.path) as archive:
+                page = [hand.to_dict()
+                        for hand in archive[max(0, stop - size):stop]]
+            # end with
+            record("store.read_page", time.perf_counter() - start)
+            yield page
+        # end for
+    # end def
+    
+    def save(self, export):
+        if not self.dirty:
+            return
+        self._make_dir()
+        with timed("store.archive_write"):
+            write_archive(self.path, export())
+        # end with
+        self.dirty = False
+    # end def
+    
+    def needs_export(self):
+        return self.dirty
+# end class
+
+'''
+Keeps one row per hand in a SQLite database, with the fields most worth
+filtering on indexed. Hands are saved as they're added, so a save is just a
+commit. Pages of hands and filtered hands can be read without going through
+the whole history.
+'''
+class SqliteStore(HandStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self._make_dir()
+        # The app reads and writes from a background thread, one task at a
+        # time, so the connection can't be tied to the thread that opened it
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS hands (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                added REAL NOT NULL,
+                hand TEXT, dora TEXT, shanten INTEGER, accepts TEXT,
+                yaku TEXT, furiten INTEGER, won INTEGER, rtn TEXT,
+                "left" INTEGER, "where" TEXT, start TEXT
+            );
+            CREATE INDEX IF NOT EXISTS hands_won ON hands (won);
+            CREATE INDEX IF NOT EXISTS hands_yaku ON hands (yaku);
+            CREATE INDEX IF NOT EXISTS hands_rtn ON hands (rtn);
+            CREATE INDEX IF NOT EXISTS hands_shanten ON hands (shanten);
+            CREATE INDEX IF NOT EXISTS hands_furiten ON hands (furiten);
+            CREATE INDEX IF NOT EXISTS hands_added ON hands (added);
+        ''')
+    
+    @timed("store.sqlite_load")
+    def load(self):
+        return self._select("ORDER BY id")
+    
+    def add(self, hand):
+        self._insert([hand])
+        self.db.commit()
+    # end def
+    
+    def extend(self, hands):
+        with self.db:
+            self._insert(hands)
+        # end with
+    # end def
+    
+    def save(self, export):
+        self.db.commit()
+    
+    def needs_export(self):
+        return False
+    
+    def close(self):
+        self.db.close()
+    
+    def pages(self, size):
+        # Page by id rather than offset, so hands added while paging through
+        # don't shift the pages
+        last = self.db.execute("SELECT MAX(id) FROM hands").fetchone()[0]
+        while last is not None:
+            rows = self.db.execute(
+                "SELECT id FROM hands WHERE id <= ? ORDER BY id DESC LIMIT ?",
+                (last, size)).fetchall()
+            if not rows:
+                return
+            yield self._select("WHERE id BETWEEN ? AND ? ORDER BY id",
+                               (rows[-1][0], last))
+            last = rows[-1][0] - 1
+        # end while
+    # end def
+    
+    '''
+    Number of saved hands.
+    '''
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM hands").fetchone()[0]
+    
+    '''
+    Read limit hands, skipping the first offset. Hands come oldest first, or
+    newest first if newest is set.
+    '''
+    def page(self, offset, limit, newest=False):
+        order = "DESC" if newest else "ASC"
+        return self._select("ORDER BY id {} LIMIT ? OFFSET ?".format(order),
+                            (limit, offset))
+    # end def
+    
+    '''
+    Read the hands matching every given filter, oldest first. won, furiten,
+    yaku and rtn must match exactly, shanten can be a value or an inclusive
+    (low, high) range. Any filter left as None is skipped.
+    '''
+    def query(self, won=None, yaku=None, rtn=None, furiten=None, shanten=None,
+              limit=-1, offset=0):
+        conds = []; args = []
+        for col, val in (("won", won), ("yaku", yaku), ("rtn", rtn),
+                         ("furiten", furiten)):
+            if val is not None:
+                conds.append(col + " = ?"); args.append(val)
+            # end if
+        # end for
+        if isinstance(shanten, tuple):
+            conds.append("shanten BETWEEN ? AND ?"); args.extend(shanten)
+        elif shanten is not None:
+            conds.append("shanten = ?"); args.append(shanten)
+        # end if
+        where = "WHERE " + " AND ".join(conds) if conds else ""
+        return self._select(where + " ORDER BY id LIMIT ? OFFSET ?",
+                            args + [limit, offset])
+    # end def
+    
+    '''
+    Copy the hands from a JSON save into the database, in one transaction.
+    Only done if the database is still empty, so it's safe to call on every
+    launch. Returns how many hands were copied over.
+    '''
+    def migrate_json(self, jsonPath):
+        if self.count():
+            return 0
+        try:
+            hands = _read_json(jsonPath)
+        except FileNotFoundError:
+            return 0
+        # end try
+        with self.db:
+            self._insert(hands)
+        print("Migrated {} hands from {}.".format(len(hands), jsonPath))
+        return len(hands)
+    # end def
+    
+    '''
+    Write every hand out as a JSON save, in the same format as JsonStore.
+    '''
+    def export_json(self, jsonPath):
+        _write_json(jsonPath, self.load())
+    
+    # Insert hands stamped with the current time, without committing
+    def _insert(self, hands):
+        now = time.time()
+        self.db.executemany(
+            'INSERT INTO hands (added, {}) VALUES (?{})'.format(
+                ", ".join('"{}"'.format(k) for k in FIELDS),
+                ", ?"*len(FIELDS)),
+            ([now] + [hand[k] for k in FIELDS] for hand in hands))
+    # end def
+    
+    # Read hands as dicts with the rest of a SELECT statement
+    def _select(self, rest, args=()):
+        cols = ", ".join('"{}"'.format(k) for k in FIELDS)
+        rows = self.db.execute("SELECT {} FROM hands {}".format(cols, rest),
+                               args)
+        return [dict(zip(FIELDS, row)) for row in rows]
+    # end def
+# end class
+
+'''
+Splits the hands into JSON list shards in a folder, one per month they were
+added in, plus a legacy shard for hands from before sharding. A manifest in
+the folder gives each shard's count and when its first and last hands were
+added. Reading goes newest shard first, so the first pages never touch the
+older shards, and saving only rewrites the shards that were added to.
+
+The shards are plain JSON lists like a JsonStore save. A shard that's in the
+folder but not the manifest, such as from a save cut off before the manifest
+got written, is picked up when the store is opened.
+'''
+class ShardStore(HandStore):
+    def __init__(self, folder):
+        super().__init__(os.path.join(folder, "manifest.json"))
+        self.folder = folder    # Folder the shards and manifest are in
+        self.shards = self._read_manifest()     # Manifest entries, oldest first
+        self.added = {}     # Shard name -> [(time, hand)] not saved yet
+    
+    @timed("store.shard_load")
+    def load(self):
+        hands = []
+        for entry in self.shards:
+            hands += self._read_shard(entry["name"])
+        # end for
+        return hands
+    # end def
+    
+    @timed("store.shard_load_parallel")
+    def load_parallel(self, workers=None):
+        paths = [self._shard_path(entry["name"]) for entry in self.shards]
+        if workers == 1 or len(paths) < 2:
+            return self.load()
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            shards = list(pool.map(_read_shard_file, paths))
+        # end with
+        hands = []
+        for entry, shard in zip(self.shards, shards):
+            hands += shard + self._unsaved(entry["name"])
+        # end for
+        return hands
+    # end def
+    
+    def pages(self, size):
+        return _paginate(self._newest_first(), size)
+    
+    def add(self, hand):
+        now = time.time()
+        name = time.strftime("%Y-%m", time.localtime(now))
+        self._entry(name)
+        self.added.setdefault(name, []).append((now, hand))
+        self.dirty = True
+    # end def
+    
+    def save(self, export):
+        if not self.dirty:
+            return
+        self._make_dir()
+        for name, added in self.added.items():
+            with timed("store.shard_write"):
+                hands = _read_shard_file(self._shard_path(name))
+                _write_json(self._shard_path(name),
+                            hands + [hand for stamp, hand in added])
+            # end with
+            entry = self._entry(name)
+            entry["count"] = len(hands) + len(added)
+            if entry["first"] is None:
+                entry["first"] = added[0][0]
+            entry["last"] = added[-1][0]
+        # end for
+        # Shards go first, so a crash leaves a shard the manifest is missing
+        # rather than a manifest entry without its hands
+        self._write_manifest()
+        self.added = {}
+        self.dirty = False
+    # end def
+    
+    def needs_export(self):
+        return False
+    
+    '''
+    Copy the hands of a JSON save, and the journal next to it if there is
+    one, into the legacy shard. Only done while there aren't any shards, so
+    it's safe to call on every launch. Returns how many hands were copied.
+    '''
+    def migrate_json(self, jsonPath):
+        if self.shards:
+            return 0
+        store = JournalStore(jsonPath)
+        if os.path.exists(store.journal):
+            hands = store.load()
+        elif os.path.exists(jsonPath):
+            hands = _read_json(jsonPath)
+        else:
+            return 0
+        # end if
+        if not hands:
+            return 0
+        self._make_dir()
+        _write_json(self._shard_path(LEGACY), hands)
+        self._entry(LEGACY)["count"] = len(hands)
+        self._write_manifest()
+        print("Migrated {} hands from {}.".format(len(hands), jsonPath))
+        return len(hands)
+    # end def
+    
+    # Hands of every shard newest first, only opening a shard once the ones
+    # after it have been gone through
+    def _newest_first(self):
+        for entry in self.shards[::-1]:
+            yield from reversed(self._unsaved(entry["name"]))
+            path = self._shard_path(entry["name"])
+            if os.path.exists(path):
+                yield from _scan_json_backward(path)
+            # end if
+        # end for
+    # end def
+    
+    # Hands of a shard, oldest first, including ones not saved yet
+    def _read_shard(self, name):
+        return _read_shard_file(self._shard_path(name)) + self._unsaved(name)
+    
+    # Hands added to a shard since the last save
+    def _unsaved(self, name):
+        return [hand for stamp, hand in self.added.get(name, [])]
+    
+    def _shard_path(self, name):
+        return os.path.join(self.folder, name + ".json")
+    
+    # Manifest entry for a shard, starting an empty one if it's new. Keeps
+    # the entries in order, with the legacy shard first.
+    def _entry(self, name):
+        for entry in self.shards:
+            if entry["name"] == name:
+                return entry
+        # end for
+        entry = {"name": name, "count": 0, "first": None, "last": None}
+        self.shards.append(entry)
+        self.shards.sort(key=lambda e: (e["name"] != LEGACY, e["name"]))
+        return entry
+    # end def
+    
+    # Read the manifest entries, adding any shards in the folder it's missing
+    def _read_manifest(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.shards = json.load(f)["shards"]
+            # end with
+        except FileNotFoundError:
+            self.shards = []
+        # end try
+        if os.path.isdir(self.folder):
+            for fn in sorted(os.listdir(self.folder)):
+                match = _SHARD_FILE.match(fn)
+                if match and not any(entry["name"] == match.group(1)
+                                     for entry in self.shards):
+                    entry = self._entry(match.group(1))
+                    entry["count"] = len(_read_json(
+                                            os.path.join(self.folder, fn)))
+                # end if
+            # end for
+        # end if
+        return self.shards
+    # end def
+    
+    # Swap in the manifest, by way of a temp file like the saves
+    def _write_manifest(self):
+        with open(self.path + ".tmp", 'w') as f:
+            json.dump({"version": 1, "shards": self.shards}, f, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        # end with
+        os.replace(self.path + ".tmp", self.path)
+    # end def
+# end class
+
+'''
+Open the store for a save file, picking the kind from its extension. A new
+SQLite database picks up the hands in the JSON save of the same name, and a
+.mja file is a binary HandArchive. A .shards folder is a ShardStore, which
+also picks up the JSON save (and its journal) of the same name when new.
+'''
+def open_store(path):
+    stem, ext = os.path.splitext(path.rstrip("/\\"))
+    if ext in (".db", ".sqlite"):
+        store = SqliteStore(path)
+        store.migrate_json(stem + ".json")
+        return store
+    elif ext == ".shards":
+        store = ShardStore(path)
+        store.migrate_json(stem + ".json")
+        return store
+    elif ext == ".jsonl":
+        return JournalStore(stem + ".json")
+    elif ext == ".mja":
+        return ArchiveStore(path)
+    # end if
+    return JsonStore(path)
+# end def
+
+# Is a journal's first line a header rather than a hand? Headers from before
+# folded held the snapshot's size, and are read as not folded.
+def _is_header(record):
+    return isinstance(record, dict) and set(record) in ({"folded"}, {"size"})
+
+# Hash of a snapshot's bytes
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+'''
+Read a JSON list of hands. An empty file counts as no hands.
+'''
+@timed("store.parse_json")
+def _read_json(path):
+    with open(path, 'r') as f:
+        text = f.read()
+    return json.loads(text) if text.strip() else []
+# end def
+
+'''
+Write a JSON list of hands by way of a temp file, so the old save is only
+replaced once the new one is complete.
+'''
+@timed("store.write_json")
+def _write_json(path, hands):
+    _write_text(path, json.dumps(hands, indent=4).encode())
+
+'''
+Write bytes to a file by way of a temp file, like _write_json.
+'''
+def _write_text(path, data):
+    with open(path + ".tmp", 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    # end with
+    os.replace(path + ".tmp", path)
+# end def
+
+'''
+Read a shard's JSON list of hands, with a missing shard having none. Run in
+the worker processes of ShardStore.load_parallel.
+'''
+def _read_shard_file(path):
+    try:
+        return _read_json(path)
+    except FileNotFoundError:
+        return []
+    # end try
+# end def
+
+'''
+Group hands coming newest first into pages of at most size hands, with each
+page put back in oldest first order.
+'''
+def _paginate(newestFirst, size):
+    page = []
+    start = time.perf_counter()
+    for hand in newestFirst:
+        page.append(hand)
+        if len(page) == size:
+            record("store.read_page", time.perf_counter() - start)
+            yield page[::-1]
+            page = []
+            start = time.perf_counter()
+        # end if
+    # end for
+    if page:
+        record("store.read_page", time.perf_counter() - start)
+        yield page[::-1]
+# end def
+
+'''
+Read the hands of a JSON list file newest first, working back from the end
+of the file a block at a time. Only the hands still to be handed out and one
+block are held at once, so the start of a large save is never read unless
+it's asked for.
+
+Going backwards from the end of a hand, the hand starts at the first '{' that
+the rest of the hand decodes from. Hands are flat dicts, so this is the right
+one unless a string in the hand holds a '{' that happens to decode.
+'''
+def _scan_json_backward(path, blockSize=1 << 16):
+    with open(path, 'rb') as f:
+        pos = f.seek(0, os.SEEK_END)    # File offset that buf starts at
+        buf = b''
+        
+        # Pull in the block before buf, returning False at the file's start
+        def extend():
+            nonlocal pos, buf
+            if pos == 0:
+                return False
+            step = min(blockSize, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            return True
+        # end def
+        
+        # File offset of the last non-whitespace byte before end, -1 if none
+        def last_byte(end):
+            while True:
+                stripped = buf[:end - pos].rstrip()
+                if stripped:
+                    return pos + len(stripped) - 1
+                if not extend():
+                    return -1
+            # end while
+        # end def
+        
+        # The byte at a file offset, which has to be in buf
+        def byte(i):
+            return buf[i - pos:i - pos + 1]
+        
+        end = last_byte(pos)
+        if end < 0:
+            return      # Empty file
+        if byte(end) != b']':
+            raise ValueError("Save file {} is not a JSON list".format(path))
+        end = last_byte(end)
+        while end >= 0 and byte(end) != b'[':
+            # end is on the closing brace of a hand, find where it opens
+            start = end
+            while True:
+                i = buf.rfind(b'{', 0, start - pos)
+                if i < 0:
+                    if not extend():
+                        raise ValueError("Bad hand in save file " + path)
+                    continue
+                # end if
+                start = pos + i
+                try:
+                    hand = json.loads(buf[start - pos:end - pos + 1])
+                    break
+                except ValueError:
+                    pass
+                # end try
+            # end while
+            yield hand
+            buf = buf[:start - pos]
+            end = last_byte(start)
+            if end >= 0 and byte(end) == b',':
+                end = last_byte(end)
+            # end if
+        # end while
+    # end with
+# end def
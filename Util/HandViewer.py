@@ -8,10 +8,17 @@ Class to encapsulate the section of the app where the saved hands are displayed
 """
 import tkinter as tk
 from Util.HandFrame import HandFrame
+from Util.HandIndex import HandIndex
+from Util.HandModel import to_record
+from Util.Instrument import timed
 
 class HandViewer:
-    def __init__(self, master, bg, bd=0, relief='solid'):
+    def __init__(self, master, bg, bd=0, relief='solid', virtual=False,
+                 overscan=2, backend=HandFrame):
         self.bg = bg
+        self.backend = backend      # Class used to display each hand
+        self.virtual = virtual      # Only build frames for visible rows?
+        self.overscan = overscan    # Extra rows kept above/below the view
         self.outerFrame = tk.Frame(master, bg=self.bg, borderwidth=bd,
                                    relief=relief)
         self.canvas = tk.Canvas(self.outerFrame)
@@ -23,6 +30,19 @@ class HandViewer:
                                                       window=self.innerFrame,
                                                       anchor='nw')
         self.loadedHands = []
+        # Virtual mode state. The data for every hand is held as a HandRecord,
+        # but only a pool of HandFrames big enough to cover the view is built.
+        self.handData = []      # Record for each hand, in display order
+        self.tiles = None       # Tile images for the pooled frames
+        self.rowPool = []       # [HandFrame, canvas item, shown row] per slot
+        self.rowHeight = 0      # Pixel height of a single hand row
+        self.nearTop = None     # Called when the view gets close to the top
+        self.onClick = None     # Called with the record of a clicked hand
+        # Filtering. The index covers every loaded hand, rows is the list of
+        # hands shown in virtual mode: handData itself unless filtered.
+        self.index = HandIndex()
+        self.query = ''         # Filter the shown hands have to match
+        self.rows = self.handData
         self.__setup_subframes()
 
     '''
@@ -35,40 +55,208 @@ class HandViewer:
     Converts a list of hand data into corresponding HandFrames and arranges
     them in the inner display frame.
     '''
+    @timed("viewer.import_hands")
     def import_hands(self, handData, tiles):
+        handData = [to_record(hand) for hand in handData]
+        self.index.clear()
+        self.index.extend(handData)
+        if self.virtual:
+            self.tiles = tiles
+            self.handData = handData
+            self.rows = self.__filter_rows()
+            self.__reset_pool()
+            self.__refresh_rows()
+            return
         # Wipe out existing frames
         if len(self.loadedHands):
             [frame.get_frame().destroy() for frame in self.loadedHands]
         # Load in the frames
-        self.loadedHands = [HandFrame(self.innerFrame, hand, tiles,
-                                  self.bg, bd=1) for hand in handData]
+        self.loadedHands = [self.__new_frame(self.innerFrame, hand, tiles)
+                            for hand in handData]
         # Arrange them in the inner frame
-        for i, frame in enumerate(self.loadedHands):
-            frame.get_frame().grid(row=i, column=0, sticky='news')
-        # end for
+        self.__grid_frames()
     # End def
     
     '''
     Exports currently loaded hands as JSON data.
     '''
     def export_hands(self):
+        if self.virtual:
+            return [hand.to_dict() for hand in self.handData]
         return [hand.get_data() for hand in self.loadedHands]
     
     '''
     Takes a single hand, placing it at the bottom of the list of loaded hands.
     '''
     def add_hand(self, handData, tiles):
+        handData = to_record(handData)
+        self.index.add(handData)
+        if self.virtual:
+            self.tiles = tiles
+            self.handData.append(handData)
+            if self.query:
+                self.rows = self.__filter_rows()
+            self.__refresh_rows()
+            return
         # Only need the binding when adding a new hand
         self.innerFrame.bind('<Configure>', self.__if_on_config)
-        newHand = HandFrame(self.innerFrame, handData, tiles, self.bg,
-                            bd=1)
+        newHand = self.__new_frame(self.innerFrame, handData, tiles)
         newHand.get_frame().grid(row=len(self.loadedHands), column=0,
                                  sticky='news')
         self.loadedHands.append(newHand)
+        if self.query:
+            self.__grid_frames()
         # This shouldn't cause problems anymore, but also not needed
         self.outerFrame.after(100, lambda: self.innerFrame.unbind('<Configure>'))
     # end def
     
+    '''
+    Takes a list of older hands, placing them above the loaded hands. The
+    view is kept on the same hands it was showing.
+    '''
+    @timed("viewer.prepend_hands")
+    def prepend_hands(self, handData, tiles):
+        handData = [to_record(hand) for hand in handData]
+        self.index.prepend(handData)
+        if self.virtual:
+            self.tiles = tiles
+            top = self.canvas.canvasy(0)
+            shown = len(self.rows)
+            self.handData[:0] = handData
+            if self.query:
+                self.rows = self.__filter_rows()
+            # end if
+            # Rows have all moved down, so every slot needs reloading
+            for slot in self.rowPool:
+                slot[2] = -1
+            # end for
+            if not self.rowHeight or not self.rows:
+                self.__refresh_rows()
+                return
+            # end if
+            self.canvas.configure(scrollregion=(0, 0,
+                                  self.canvas.winfo_width() - 1,
+                                  self.rowHeight*len(self.rows)))
+            self.canvas.yview_moveto((top + self.rowHeight*(len(self.rows)
+                                                            - shown))
+                                     / (self.rowHeight*len(self.rows)))
+            self.__refresh_rows()
+            return
+        # end if
+        self.innerFrame.bind('<Configure>', self.__if_on_config)
+        self.loadedHands[:0] = [self.__new_frame(self.innerFrame, hand,
+                                                 tiles)
+                                for hand in handData]
+        self.__grid_frames()
+        self.outerFrame.after(100, lambda: self.innerFrame.unbind('<Configure>'))
+    # end def
+    
+    '''
+    Only show the hands matching a query, see HandIndex for how they're
+    written. An empty query shows every hand again. Raises QueryError if the
+    query can't be understood, leaving the shown hands as they were.
+    '''
+    def filter_hands(self, query):
+        query = query.strip()
+        self.index.query(query)
+        self.query = query
+        if not self.virtual:
+            self.__grid_frames()
+            return
+        # end if
+        self.rows = self.__filter_rows()
+        for slot in self.rowPool:
+            slot[2] = -1
+        # end for
+        self.scroll_to_end()
+    # end def
+    
+    '''
+    Number of hands matching the filter, out of all the loaded hands.
+    '''
+    def shown_count(self):
+        if not self.query:
+            return self.index.size
+        return len(self.index.query(self.query))
+    # end def
+    
+    '''
+    Set a function to call whenever the view comes within a screen of the top
+    of the loaded hands, such as to load older ones. Only used in virtual mode.
+    '''
+    def bind_near_top(self, callback):
+        self.nearTop = callback
+    
+    '''
+    Set a function to call with a hand's HandRecord when it gets clicked on.
+    '''
+    def bind_click(self, callback):
+        self.onClick = callback
+        for frame in self.loadedHands:
+            frame.bind_click(callback)
+        for frame, item, row in self.rowPool:
+            frame.bind_click(callback)
+        # end for
+    # end def
+    
+    '''
+    Scroll the view down to the newest hands.
+    '''
+    def scroll_to_end(self):
+        self.canvas.yview_moveto(1.0)
+        if self.virtual:
+            self.__refresh_rows()
+    # end def
+    
+    '''
+    Switch the tile images used to show the hands, e.g. to change the zoom.
+    '''
+    def set_tiles(self, tiles):
+        if self.virtual:
+            # Rows may be a different height now, so rebuild the pool
+            self.tiles = tiles
+            self.rowHeight = 0
+            self.__reset_pool()
+            self.__refresh_rows()
+            return
+        # end if
+        for frame in self.loadedHands:
+            frame.set_images(tiles)
+        # end for
+    # end def
+    
+    # Build a frame for a hand, passing on clicks if anything wants them
+    def __new_frame(self, master, hand, tiles):
+        frame = self.backend(master, hand, tiles, self.bg, bd=1)
+        if self.onClick is not None:
+            frame.bind_click(self.onClick)
+        return frame
+    # end def
+    
+    # The hands matching the filter, in order
+    def __filter_rows(self):
+        if not self.query:
+            return self.handData
+        return [self.handData[i] for i in self.index.query(self.query)]
+    # end def
+    
+    # Grid the frames matching the filter and take the rest out of the grid.
+    # Rows keep their place, so putting a frame back needs nothing else moved.
+    def __grid_frames(self):
+        if self.query:
+            shown = set(self.index.query(self.query))
+        else:
+            shown = range(len(self.loadedHands))
+        # end if
+        for i, frame in enumerate(self.loadedHands):
+            if i in shown:
+                frame.get_frame().grid(row=i, column=0, sticky='news')
+            else:
+                frame.get_frame().grid_remove()
+            # end if
+        # end for
+    # end def
+    
     '''
     Arrange all of the sub frames and their scaling in the viewer frame
     '''
@@ -83,6 +271,12 @@ class HandViewer:
         # Needed for Scrolling to work
         self.canvas.config(yscrollcommand = self.scroll.set)
         self.canvas.bind('<Configure>', self.__canvas_on_config)
+        # Rows in virtual mode sit directly on the canvas, and need to be
+        # swapped around whenever the view moves.
+        if self.virtual:
+            self.canvas.delete(self.canvasWindow)
+            self.scroll.configure(command=self.__on_scroll)
+        # end if
     # end def
     
     '''
@@ -90,6 +284,11 @@ class HandViewer:
     and expands the canvas window into any empty space within the canvas.
     '''
     def __canvas_on_config(self, event):
+        if self.virtual:
+            for frame, item, row in self.rowPool:
+                self.canvas.itemconfig(item, width=event.width-1)
+            self.__refresh_rows()
+            return
         self.canvas.itemconfig(self.canvasWindow, width=event.width-1)
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
         
@@ -102,4 +301,88 @@ class HandViewer:
         self.canvas.itemconfig(self.canvasWindow, height=event.height)
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
     
-# end class
\ No newline at end of file
+    '''
+    Scrollbar command in virtual mode. Moves the view as normal, then brings
+    the pooled rows along with it.
+    '''
+    def __on_scroll(self, *args):
+        self.canvas.yview(*args)
+        self.__refresh_rows()
+    
+    '''
+    Throw away the pooled rows so they get rebuilt with the current tiles.
+    '''
+    def __reset_pool(self):
+        for frame, item, row in self.rowPool:
+            self.canvas.delete(item)
+            frame.get_frame().destroy()
+        # end for
+        self.rowPool = []
+    # end def
+    
+    '''
+    Size the scroll region to the full list of hands, then load the rows
+    currently in view (plus the overscan) into the pooled frames. A row is
+    always shown by the same slot, so frames only get reloaded when their row
+    scrolls into view.
+    '''
+    @timed("viewer.refresh_rows")
+    def __refresh_rows(self):
+        if not self.rows:
+            self.__reset_pool()
+            self.canvas.configure(scrollregion=(0, 0, 0, 0))
+            return
+        # end if
+        width = self.canvas.winfo_width()
+        if not self.rowHeight:
+            self.rowHeight = self.__measure_row()
+        # end if
+        self.canvas.configure(scrollregion=(0, 0, width - 1,
+                                            self.rowHeight*len(self.rows)))
+        # Grow the pool if the viewport can fit more rows than before
+        viewRows = self.canvas.winfo_height()//self.rowHeight + 1
+        while len(self.rowPool) < min(viewRows + 2*self.overscan,
+                                      len(self.rows)):
+            frame = self.__new_frame(self.canvas, self.rows[0], self.tiles)
+            item = self.canvas.create_window((0, 0), window=frame.get_frame(),
+                                             anchor='nw', width=width-1,
+                                             state='hidden')
+            self.rowPool.append([frame, item, -1])
+        # end while
+        
+        top = int(self.canvas.canvasy(0))//self.rowHeight
+        if self.nearTop is not None and top < viewRows:
+            self.nearTop()
+        # end if
+        first = max(0, top - self.overscan)
+        last = min(len(self.rows), first + len(self.rowPool))
+        for i in range(first, last):
+            slot = self.rowPool[i % len(self.rowPool)]
+            if slot[2] != i:
+                slot[0].load(self.rows[i])
+                self.canvas.coords(slot[1], 0, i*self.rowHeight)
+                self.canvas.itemconfig(slot[1], state='normal')
+                slot[2] = i
+            # end if
+        # end for
+        # Hide any slots that don't have a row to show
+        for slot in self.rowPool:
+            if not first <= slot[2] < last:
+                self.canvas.itemconfig(slot[1], state='hidden')
+                slot[2] = -1
+            # end if
+        # end for
+    # end def
+    
+    '''
+    Build a throwaway frame for the first hand to find how tall a row is.
+    '''
+    def __measure_row(self):
+        frame = self.backend(self.canvas, self.rows[0], self.tiles,
+                             self.bg, bd=1)
+        frame.get_frame().update_idletasks()
+        height = frame.get_frame().winfo_reqheight()
+        frame.get_frame().destroy()
+        return max(height, 1)
+    # end def
+# end class
@@ -6,15 +6,36 @@ Created on Sat Aug 24 22:48:55 2024
 @author: giova
 
 Class to encapsulate the section of the app where the input widgets live.
+Fields are checked as they're typed in, once typing pauses for DEBOUNCE ms,
+and the tile fields get a preview of their tiles drawn under them.
 """
 import tkinter as tk
+from functools import lru_cache
 from tkinter.font import Font as tkFont
+from Util.HandCanvas import draw_tiles
+from Util.HandModel import MpszError, check_field, read_tiles
+from Util.Shanten import shanten
+from Util.Ukeire import ukeire
+
+# Milliseconds typing has to pause for before the changed fields get checked
+DEBOUNCE = 150
+# Fields with a preview of their tiles
+PREVIEWS = ("hand", "start", "dora")
+# Fields that get filled in from the hand if they're left blank
+FILLED = ("shanten", "accepts")
 
 class InputFrame:
-    def __init__(self, master, bg, bd=0, relief='solid'):
+    def __init__(self, master, bg, bd=0, relief='solid', tiles=None):
         self.font = tkFont(size=12)
+        self.tiles = tiles              # Tile images for the previews
         self.wonCheck = tk.IntVar()     # Control variable for won Checkbutton
         self.furiCheck = tk.IntVar()    # Control variable for furi Checkbutton
+        # Control variable for each Entry, by the Entry's name
+        self.texts = {key: tk.StringVar() for key in ("hand", "start", "dora",
+                      "accepts", "shanten", "yaku", "rtn", "where", "left")}
+        self.changed = set()    # Fields edited since they were last checked
+        self.timer = None       # Pending check of the changed fields
+        self.onChange = None    # Called with the fields checked after typing
         self.frame = tk.Frame(master, bg=bg, bd=bd, relief=relief)
         
         # There is a label and some form of input widget for each JSON key.
@@ -22,26 +43,32 @@ class InputFrame:
         self.handLabel = tk.Label(self.frame, bg=bg, text='Final Hand',
                                   font=self.font)
         self.handInput = tk.Entry(self.frame, font=self.font, name="hand",
-                                  exportselection=0)
+                                  exportselection=0,
+                                  textvariable=self.texts["hand"])
         self.startLabel = tk.Label(self.frame, bg=bg, text='Dealt Hand',
                                   font=self.font)
         self.startInput = tk.Entry(self.frame, font=self.font, name="start",
-                                   exportselection=0)
+                                   exportselection=0,
+                                   textvariable=self.texts["start"])
         self.doraLabel = tk.Label(self.frame, bg=bg, text='Revealed Dora',
                                   font=self.font)
         self.doraInput = tk.Entry(self.frame, font=self.font, name="dora",
-                                  exportselection=0)
+                                  exportselection=0,
+                                  textvariable=self.texts["dora"])
         self.acceptLabel = tk.Label(self.frame, bg=bg, text='Accepts/Wait',
                                     font=self.font)
         self.acceptInput = tk.Entry(self.frame, font=self.font, name="accepts",
-                                    exportselection=0)
+                                    exportselection=0,
+                                    textvariable=self.texts["accepts"])
         self.shantenLabel = tk.Label(self.frame, bg=bg, text='Shanten',
                                      font=self.font)
         self.shantenInput = tk.Entry(self.frame, font=self.font, name="shanten",
-                                     exportselection=0)
+                                     exportselection=0,
+                                     textvariable=self.texts["shanten"])
         self.yakuLabel = tk.Label(self.frame, bg=bg, text='Yaku', font=self.font)
         self.yakuInput = tk.Entry(self.frame, font=self.font, name="yaku",
-                                  exportselection=0)
+                                  exportselection=0,
+                                  textvariable=self.texts["yaku"])
         self.wonLabel = tk.Label(self.frame, bg=bg, text='Won?', font=self.font)
         self.wonInput = tk.Checkbutton(self.frame, bg=bg, name="won",
                                        variable=self.wonCheck)
@@ -52,15 +79,18 @@ class InputFrame:
         self.rtnLabel = tk.Label(self.frame, bg=bg, text='Ron/Tsumo?',
                                  font=self.font)
         self.rtnInput = tk.Entry(self.frame, font=self.font, name="rtn",
-                                 exportselection=0)
+                                 exportselection=0,
+                                 textvariable=self.texts["rtn"])
         self.whereLabel = tk.Label(self.frame, bg=bg, text='Where?',
                                    font=self.font)
         self.whereInput = tk.Entry(self.frame, font=self.font, name="where",
-                                   exportselection=0)
+                                   exportselection=0,
+                                   textvariable=self.texts["where"])
         self.leftLabel = tk.Label(self.frame, bg=bg, text='# Left',
                                   font=self.font)
         self.leftInput = tk.Entry(self.frame, font=self.font, name="left",
-                                  exportselection=0)
+                                  exportselection=0,
+                                  textvariable=self.texts["left"])
         
         # Convenience
         self.widgets = [[self.handLabel,  self.doraLabel,   self.shantenLabel, self.wonLabel,  self.rtnLabel, self.leftLabel],
@@ -68,100 +98,169 @@ class InputFrame:
                         [self.startLabel, self.acceptLabel, self.yakuLabel,    self.furiLabel, self.whereLabel],
                         [self.startInput, self.acceptInput, self.yakuInput,    self.furiInput, self.whereInput]]
         
+        # Label of each field, by the name of its input widget
+        self.labels = {widget.winfo_name(): label
+                       for row in (0, 2)
+                       for label, widget in zip(self.widgets[row],
+                                                self.widgets[row + 1])}
+        # Canvas under each tile field showing what's been typed as tiles,
+        # along with the images drawn so they don't get dropped from the LRU
+        self.previews = {key: tk.Canvas(self.frame, bg=bg, height=0,
+                                        highlightthickness=0)
+                         for key in PREVIEWS}
+        self.shown = {key: [] for key in PREVIEWS}
+        for key, text in self.texts.items():
+            text.trace_add('write',
+                           lambda *args, key=key: self.__on_edit(key))
+        # end for
+        
         # Set up the widgets
         self.__setup_widgets()
         
     def get_frame(self):
         return self.frame
     
+    '''
+    Switch the tile images the previews are drawn with, e.g. for a new zoom.
+    '''
+    def set_tiles(self, tiles):
+        self.tiles = tiles
+        for key in PREVIEWS:
+            self.__draw_preview(key)
+        # end for
+    # end def
+    
+    '''
+    Set a function to call with the set of field names that were just
+    checked, each time typing pauses.
+    '''
+    def bind_change(self, callback):
+        self.onChange = callback
+    
+    '''
+    Get what's in a field cleaned up by check_field, or None if it's blank
+    or doesn't pass.
+    '''
+    def checked(self, key):
+        return _check(key, self.texts[key].get())[0]
+    
     '''
     Get and check the input for each widget, turning the label's color red if
     the input is improper for that widget. Returns -1 if an input was invalid,
-    or the inputs from the widgets if all are valid
+    or the inputs from the widgets if all are valid. Blank shanten and accepts
+    get filled in from the hand first.
     '''
     def get_input(self):
-        # Set the labels all back to black
-        for label in self.widgets[0] + self.widgets[2]:
-            label['foreground'] = "black"
+        hand, handError = _check("hand", self.texts["hand"].get())
+        if handError is None:
+            if not self.texts["shanten"].get().strip():
+                self.shantenInput.insert(0, str(_hand_shanten(hand)))
+            if not self.texts["accepts"].get().strip():
+                self.acceptInput.insert(0, self.calc_accepts(
+                    hand, self.texts["dora"].get().lower().strip()))
+            # end if
+        # end if
+        # Everything gets checked here, so there's no need for a pending one
+        if self.timer is not None:
+            self.frame.after_cancel(self.timer)
+            self.timer = None
+        # end if
+        self.changed.clear()
         
         fail = False
         res = []; keyMap = []
-        # Check the first row's inputs
-        for i, widget in enumerate(self.widgets[1]):
-            inp = widget.get().lower().strip() if type(widget)==tk.Entry else self.wonCheck.get()
-            valid = True    # Applicable for Won
-            match i:
-                # Hand should be MSPZ valid
-                case 0:
-                    valid = inp and self.mpsz_valid(inp)
-                # Dora should be MSPZ valid and not contain spaces
-                case 1:
-                    valid = inp and self.mpsz_valid(inp) and not ' ' in inp
-                # Shanten and Left should be integers (negative is valid for
-                # Shanten, but not checked for Left)
-                case 2 | 5:
-                    try:
-                        if inp == '':
-                            raise ValueError
-                        inp = int(inp)
-                    except ValueError:
-                        valid = False
-                # Ron/Tsumo/Hit/NA are the only valid options, as well as their
-                # short codes
-                case 4:
-                    valid = inp in {'r','ron','t','tsumo','h','hit','n','na',
-                                   'n/a'}
-            # end match
-            if not valid:
-                self.widgets[0][i]['foreground'] = "red"
-                fail = True
-            res.append(inp); keyMap.append(widget.winfo_name())
-        # end for
-        
-        # Check the second row's inputs
-        for i, widget in enumerate(self.widgets[3]):
-            inp = widget.get().lower().strip() if type(widget)==tk.Entry else self.furiCheck.get()
-            valid = True    # Applicable for Furi
-            match i:
-                # Start and Accept should be MPSZ valid
-                # TODO: Accept will need special formatting
-                case 0 | 1:
-                    valid = inp and self.mpsz_valid(inp)
-                # Yaku and Where just needs to have something
-                case 2 | 4:
-                    valid = inp
-                # end case
-            # end match
-            if not valid:
-                self.widgets[2][i]['foreground'] = "red"
-                fail = True
-            res.append(inp); keyMap.append(widget.winfo_name())
+        for widget in self.widgets[1] + self.widgets[3]:
+            key = widget.winfo_name()
+            if key == "won":
+                inp = self.wonCheck.get()
+            elif key == "furiten":
+                inp = self.furiCheck.get()
+            else:
+                inp, err = self.__show_check(key, live=False)
+                if err is not None:
+                    fail = True
+                    # Put the cursor where the MPSZ went wrong
+                    if isinstance(err, MpszError):
+                        widget.icursor(err.pos)
+                    # end if
+                # end if
+            # end if
+            res.append(inp); keyMap.append(key)
         # end for
         return -1 if fail else zip(res, keyMap)
     # end def
     
     '''
-    Checks for valid MSPZ input, namely that at least one of those letters are
-    present and that the # of digits meets or exceeds the # of those letters.
-    Spaces and 'b' are also accepted. Not perfect, but solid.
+    Get the tiles a hand accepts in MPSZ notation, taking the dora indicators
+    into account if they're valid.
     '''
-    def mpsz_valid(self, string):
-        string = string.lower()
-        valLetters = 0; digs = 0;
-        if not string[-1].isnumeric():
-            return False
-        for i,l in enumerate(string):
-            if l in set('mpszb'):
-                valLetters += 1
-                if not string[i+1].isnumeric():
-                    return False
-            elif l.isnumeric():
-                digs += 1
-            elif l != ' ':
-                return False
+    def calc_accepts(self, hand, dora):
+        try:
+            return ukeire(hand, dora).mpsz()
+        except MpszError:
+            return ukeire(hand).mpsz()
+        # end try
+    # end def
+    
+    # Trace on every Entry. Restarts the wait for typing to pause.
+    def __on_edit(self, key):
+        self.changed.add(key)
+        if self.timer is not None:
+            self.frame.after_cancel(self.timer)
+        self.timer = self.frame.after(DEBOUNCE, self.__check_changed)
+    # end def
+    
+    # Check the fields edited since last time, and redraw their previews
+    def __check_changed(self):
+        self.timer = None
+        changed = self.changed
+        self.changed = set()
+        # Shanten and accepts are checked against the hand
+        if "hand" in changed:
+            changed |= set(FILLED)
+        for key in changed:
+            self.__show_check(key, live=True)
+            if key in PREVIEWS:
+                self.__draw_preview(key)
             # end if
         # end for
-        return False if valLetters > digs else True
+        if self.onChange is not None:
+            self.onChange(changed)
+    # end def
+    
+    # Check a field and color its label for it, as red if it's invalid or
+    # orange for a shanten that doesn't match the hand. Blank fields aren't
+    # marked while typing, as they just haven't been filled in yet. Gives
+    # (value, None) or (None, the problem).
+    def __show_check(self, key, live):
+        text = self.texts[key].get()
+        hand, handError = _check("hand", self.texts["hand"].get())
+        if live and key in FILLED and not text.strip() and handError is None:
+            # Gets filled in from the hand on Add Hand
+            value, err = '', None
+        else:
+            value, err = _check(key, text)
+        # end if
+        color = "black"
+        if err is not None:
+            if not (live and not text.strip()):
+                color = "red"
+        elif key == "shanten" and value != '' and handError is None and \
+                value != _hand_shanten(hand):
+            # Doesn't match the hand, worth a look but not an error
+            color = "dark orange"
+        # end if
+        self.labels[key]['foreground'] = color
+        return value, err
+    # end def
+    
+    # Draw a field's tiles under it, reading them leniently so partly typed
+    # hands still show what there is so far
+    def __draw_preview(self, key):
+        if self.tiles is None:
+            return
+        tiles = read_tiles(self.texts[key].get().lower().strip())
+        self.shown[key] = draw_tiles(self.previews[key], tiles, self.tiles)
     # end def
     
     '''
@@ -169,14 +268,15 @@ class InputFrame:
     '''
     def __setup_widgets(self):
         # The input section will be subdivided into 2 rows that are also
-        # subdivided into two: the top for the widget label, and the bottom for
-        # the actual widget.
+        # subdivided into three: the top for the widget label, the middle for
+        # the actual widget, and the bottom for the tile previews.
+        rows = (0, 1, 3, 4)
         
         # Place the widgets into the grid
         for i in range(len(self.widgets)):
             sticky = 'ew' if i%2 else 'sw'
             for j, widget in enumerate(self.widgets[i]):
-                widget.grid(row=i, column=j, sticky=sticky, padx=5)
+                widget.grid(row=rows[i], column=j, sticky=sticky, padx=5)
                 if i == 3:
                     widget.grid(pady=(0,5))
                 # end if
@@ -186,11 +286,30 @@ class InputFrame:
         self.wonLabel.grid(sticky='s')
         self.furiLabel.grid(sticky='s')
         self.furiInput.grid(padx=0)
+        # Previews go under their fields
+        self.previews["hand"].grid(row=2, column=0, sticky='w', padx=5)
+        self.previews["dora"].grid(row=2, column=1, sticky='w', padx=5)
+        self.previews["start"].grid(row=5, column=0, sticky='w', padx=5)
         
-        # Set grid weights
-        [self.frame.grid_rowconfigure(i, weight=1) for i in range(len(
-                                                                self.widgets))]
+        # Set grid weights, previews only take the space their tiles need
+        [self.frame.grid_rowconfigure(i, weight=1) for i in rows]
         self.frame.grid_columnconfigure(0, weight=3)
         self.frame.grid_columnconfigure(1, weight=1)
     # end def
-# end class
\ No newline at end of file
+# end class
+
+# check_field of a field as typed, as (value, None) or (None, the problem).
+# Cached, as the fields that didn't change get checked again on each Add Hand.
+@lru_cache(maxsize=1024)
+def _check(key, text):
+    try:
+        return check_field(key, text), None
+    except ValueError as e:
+        return None, e
+    # end try
+# end def
+
+# Shanten of a hand that passed check_field
+@lru_cache(maxsize=256)
+def _hand_shanten(hand):
+    return shanten(hand)
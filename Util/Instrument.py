@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 19:10:27 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Lightweight timing for the slow paths of the app. Wrap code in timed() (as a
+with block or a decorator) to record how many times it ran and how long it
+took. Timings can also go to a log file, and a session can be profiled with
+cProfile and tracemalloc to find what's slow on a given machine.
+"""
+import cProfile
+import functools
+import os
+import threading
+import time
+import tracemalloc
+
+_stats = {}         # Name -> [calls, total seconds, slowest seconds]
+_log = None         # Open log file, if logging
+_profiler = None    # Running cProfile.Profile, if profiling
+_lock = threading.Lock()    # Timings can come in from background threads
+
+'''
+Times a block of code under a name, as a context manager or decorator:
+    with timed("store.save"): ...
+    @timed("view.arrange")
+'''
+class timed:
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+    
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(self.name):
+                return func(*args, **kwargs)
+        # end def
+        return wrapper
+    # end def
+# end class
+
+'''
+Record one run of name that took the given seconds.
+'''
+def record(name, seconds):
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            entry = _stats[name] = [0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        if _log is not None:
+            _log.write("{:.3f}\t{}\t{:.6f}\n".format(time.time(), name,
+                                                     seconds))
+        # end if
+    # end with
+# end def
+
+'''
+Get the timings so far as (name, calls, total seconds, slowest seconds),
+most total time first.
+'''
+def summary():
+    with _lock:
+        rows = [(name, calls, total, worst)
+                for name, (calls, total, worst) in _stats.items()]
+    # end with
+    return sorted(rows, key=lambda row: -row[2])
+# end def
+
+'''
+Timings so far as text, one line per name. Only the top entries are given if
+limit is set.
+'''
+def report(limit=None):
+    return "\n".join("{}: {} x {:.1f}ms (max {:.1f}ms)".format(
+                     name, calls, 1000*total/calls, 1000*worst)
+                     for name, calls, total, worst in summary()[:limit])
+# end def
+
+'''
+Forget every timing so far.
+'''
+def reset():
+    _stats.clear()
+
+'''
+Also write each timing to a log file as it's recorded, as tab separated
+epoch time, name and seconds. Lines are buffered, call stop_log to flush.
+'''
+def start_log(path):
+    global _log
+    stop_log()
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    _log = open(path, 'a')
+# end def
+
+def stop_log():
+    global _log
+    if _log is not None:
+        _log.close()
+        _log = None
+    # end if
+# end def
+
+'''
+Start profiling everything run from here on, with cProfile for time and
+tracemalloc for memory. Meant to be turned on for a single session.
+'''
+def start_profile():
+    global _profiler
+    tracemalloc.start()
+    _profiler = cProfile.Profile()
+    _profiler.enable()
+# end def
+
+'''
+Stop profiling and write the results into a folder: profile.pstats for
+cProfile (read with pstats or snakeviz), and memory.txt with the lines that
+allocated the most memory still in use.
+'''
+def stop_profile(folder, top=30):
+    global _profiler
+    if _profiler is None:
+        return
+    _profiler.disable()
+    os.makedirs(folder, exist_ok=True)
+    _profiler.dump_stats(os.path.join(folder, "profile.pstats"))
+    _profiler = None
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    with open(os.path.join(folder, "memory.txt"), 'w') as f:
+        for stat in snapshot.statistics('lineno')[:top]:
+            f.write(str(stat) + "\n")
+        # end for
+    # end with
+# end def
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 11:42:27 2026
+
+@author: Giovanni "Veirya" Oliver
+
+NumPy versions of HandModel.parse and Shanten.shanten for whole columns of
+MPSZ strings at once, for code that goes over every saved hand (the stats
+and the similar hand search). Plain strings, just suit letters and digits
+with no calls or face-down tiles, are read as one byte matrix with no Python
+loop per hand. Anything else goes through parse one at a time, so the
+results always match it. Needs NumPy, and doesn't touch tkinter.
+"""
+import numpy as np
+from Util.HandModel import MpszError, TILE_COUNT, parse
+from Util.Shanten import TERMINALS, shanten, suit_table
+from Util.Ukeire import SUIT_RANGES
+
+# Suit number of each byte, -1 for anything that isn't a plain suit letter
+_SUITS = np.full(256, -1, dtype=np.int8)
+for _s, _c in enumerate(b"mpsz"):
+    _SUITS[_c] = _s
+# end for
+# Melds counted separately, more than 4 can't change the shanten
+MAX_MELDS = 4
+# Best t of a (m, p) that can't be made
+NONE = -100
+# Best t for each (m, p) of a suit, keyed by the suit's counts as a base 5
+# number. Kept for good like the tables in Util.Shanten.
+_bests = {}
+
+'''
+34 slot counts of the plain strings in a list, as (counts, plain): a matrix
+with a row per string, and which rows were plain and valid. Other rows are
+left at zero.
+'''
+def plain_counts(strings):
+    n = len(strings)
+    counts = np.zeros((n, TILE_COUNT), dtype=np.int16)
+    if not n:
+        return counts, np.zeros(0, dtype=bool)
+    try:
+        chars = np.array(strings, dtype=bytes)
+    except (UnicodeEncodeError, TypeError, ValueError):
+        # Strings that can't be bytes aren't plain, leave them to parse
+        chars = np.array([s if isinstance(s, str) and s.isascii() else ''
+                          for s in strings], dtype=bytes)
+    # end try
+    width = max(chars.itemsize, 1)
+    raw = np.frombuffer(chars.tobytes(), dtype=np.uint8).reshape(n, width)
+    pos = np.arange(width)
+    used = pos < np.char.str_len(chars)[:, None]
+    suit = _SUITS[raw]
+    letter = suit >= 0
+    digit = (raw >= ord('0')) & (raw <= ord('9'))
+    # Which letter each digit belongs to, the last one before it
+    last = np.maximum.accumulate(np.where(letter, pos, -1), axis=1)
+    owner = np.take_along_axis(suit, np.maximum(last, 0), axis=1)
+    value = raw.astype(np.int16) - ord('0')
+    nextLetter = np.zeros_like(letter)
+    nextLetter[:, :-1] = letter[:, 1:] | ~used[:, 1:]
+    nextLetter[:, -1] = True
+    bad = used & ~(letter | digit)                  # Spaces, b, anything else
+    bad |= digit & (last < 0)                       # Tile without a suit
+    bad |= letter & nextLetter                      # Letter without tiles
+    bad |= digit & (owner == 3) & ((value == 0) | (value > 7))
+    plain = ~bad.any(axis=1) & used[:, 0]
+    tile = digit & plain[:, None]
+    rows = np.nonzero(tile)[0]
+    idx = owner[tile].astype(np.intp)*9 + np.where(value[tile] == 0, 4,
+                                                   value[tile] - 1)
+    counts += np.bincount(rows*TILE_COUNT + idx, minlength=n*TILE_COUNT
+                          ).reshape(n, TILE_COUNT).astype(np.int16)
+    plain &= (counts <= 4).all(axis=1)
+    counts[~plain] = 0
+    return counts, plain
+# end def
+
+'''
+34 slot counts of every face up tile of each string, the same as
+parse(string).counts, as (counts, valid). Rows that aren't valid MPSZ are
+left at zero.
+'''
+def read_counts(strings):
+    counts, valid = plain_counts(strings)
+    for i in np.nonzero(~valid)[0]:
+        try:
+            counts[i] = np.frombuffer(parse(strings[i]).counts,
+                                      dtype=np.uint8)
+            valid[i] = True
+        except (MpszError, TypeError):
+            pass
+        # end try
+    # end for
+    return counts, valid
+# end def
+
+'''
+Shanten of each string, the same as Shanten.shanten, as (shanten, valid).
+Plain hands get worked out together from their counts. Hands with calls go
+through shanten one at a time.
+'''
+def shanten_column(strings):
+    counts, plain = plain_counts(strings)
+    res = np.zeros(len(strings), dtype=np.int16)
+    valid = plain.copy()
+    res[plain] = closed_shanten(counts[plain])
+    for i in np.nonzero(~plain)[0]:
+        try:
+            res[i] = shanten(strings[i])
+            valid[i] = True
+        except (MpszError, TypeError):
+            pass
+        # end try
+    # end for
+    return res, valid
+# end def
+
+'''
+Shanten of closed hands without calls from their count matrix, the lowest of
+standard, chiitoitsu and kokushi.
+'''
+def closed_shanten(counts):
+    n = len(counts)
+    # Best t for each (m, p) of the suits merged so far
+    merged = np.full((n, MAX_MELDS + 1, 2), NONE, dtype=np.int16)
+    merged[:, 0, 0] = 0
+    for lo, hi in SUIT_RANGES:
+        table = _suit_tables(counts[:, lo:hi])
+        nxt = np.full_like(merged, NONE)
+        for m1 in range(MAX_MELDS + 1):
+            for m2 in range(MAX_MELDS + 1):
+                m = min(m1 + m2, MAX_MELDS)
+                for p1, p2 in ((0, 0), (0, 1), (1, 0)):
+                    np.maximum(nxt[:, m, p1 + p2],
+                               merged[:, m1, p1] + table[:, m2, p2],
+                               out=nxt[:, m, p1 + p2])
+                # end for
+            # end for
+        # end for
+        merged = np.maximum(nxt, NONE)
+    # end for
+    res = np.full(n, 8, dtype=np.int16)
+    for m in range(MAX_MELDS + 1):
+        for p in range(2):
+            t = merged[:, m, p]
+            score = 8 - 2*m - np.minimum(t, MAX_MELDS - m) - p
+            res = np.where(t >= 0, np.minimum(res, score), res)
+        # end for
+    # end for
+    pairs = (counts >= 2).sum(axis=1)
+    kinds = (counts > 0).sum(axis=1)
+    res = np.minimum(res, 6 - pairs + np.maximum(0, 7 - kinds))
+    ends = counts[:, TERMINALS]
+    res = np.minimum(res, 13 - (ends > 0).sum(axis=1)
+                     - (ends >= 2).any(axis=1))
+    return res
+# end def
+
+# Best t for each (m, p) of one suit's counts, from the shared suit tables.
+# Each distinct pattern only gets looked up once.
+def _suit_tables(counts):
+    width = counts.shape[1]
+    keys = counts.astype(np.int64) @ 5**np.arange(width, dtype=np.int64)
+    keys, first, inverse = np.unique(keys, return_index=True,
+                                     return_inverse=True)
+    rows = counts[first].astype(np.uint8).tobytes()
+    tables = np.empty((len(keys), MAX_MELDS + 1, 2), dtype=np.int16)
+    for k, key in enumerate(keys.tolist()):
+        best = _bests.get((width, key))
+        if best is None:
+            best = np.full((MAX_MELDS + 1, 2), NONE, dtype=np.int16)
+            for m, p, t in suit_table(rows[k*width:(k + 1)*width]):
+                m = min(m, MAX_MELDS)
+                best[m, p] = max(best[m, p], t)
+            # end for
+            _bests[(width, key)] = best
+        # end if
+        tables[k] = best
+    # end for
+    return tables[inverse.reshape(-1)]
+# end def
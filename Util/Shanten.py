@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 14:31:52 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Shanten calculator for standard hands, chiitoitsu and kokushi, working off
+the 34 slot counts from HandModel.
+
+Standard hands are split up one suit at a time. The best ways to break a
+suit into melds (m), partial melds (t) and a pair (p) only depend on the
+counts in that suit, so they're looked up from per-suit tables keyed by the
+suit's 9 counts (7 for honors). Tables get filled in the first time a suit
+pattern shows up, after which a hand is just four lookups and a merge.
+"""
+from Util.HandModel import Hand, parse, MpszError
+
+# Terminal and honor tile indices, for kokushi
+TERMINALS = (0, 8, 9, 17, 18, 26, 27, 28, 29, 30, 31, 32, 33)
+# Per-suit tables, keyed by the suit's counts as bytes. Each entry is a tuple
+# of (m, p, t) with the most t for that m and p.
+_tables = {}
+
+'''
+Get the shanten of a hand, the lowest of its standard, chiitoitsu and kokushi
+shanten. Takes a Hand or MPSZ string. -1 means the hand is complete.
+'''
+def shanten(hand):
+    if not isinstance(hand, Hand):
+        hand = parse(hand)
+    res = standard_shanten(hand.closed, len(hand.calls))
+    # Chiitoitsu and kokushi can't have calls
+    if not hand.calls:
+        res = min(res, chiitoi_shanten(hand.closed),
+                  kokushi_shanten(hand.closed))
+    # end if
+    return res
+# end def
+
+'''
+Shanten of a standard 4 melds and a pair hand, given the 34 slot counts of
+the closed tiles and the number of melds already called.
+'''
+def standard_shanten(closed, calls=0):
+    return blocks_shanten(suit_blocks(closed), calls)
+
+'''
+Look up the (m, p, t) options for each of the four suits of a 34 slot count.
+Ukeire reuses these, only redoing the suit a drawn tile lands in.
+'''
+def suit_blocks(counts):
+    return [suit_table(counts[0:9]), suit_table(counts[9:18]),
+            suit_table(counts[18:27]), suit_table(counts[27:34])]
+
+'''
+Get the table entry for one suit's counts, working it out if it's the first
+time the pattern has come up. Honors are the suit with only 7 counts.
+'''
+def suit_table(counts):
+    counts = bytes(counts)
+    entry = _tables.get(counts)
+    if entry is None:
+        best = _split(counts, len(counts) == 7, {})
+        entry = tuple((m, p, t) for (m, p), t in best.items())
+        _tables[counts] = entry
+    # end if
+    return entry
+# end def
+
+'''
+Work out the standard shanten from the table entries for each suit, merging
+the suits' options and scoring every way they fit together.
+'''
+def blocks_shanten(blocks, calls):
+    merged = {(0, 0): 0}
+    for entry in blocks:
+        nxt = {}
+        for (m1, p1), t1 in merged.items():
+            for m2, p2, t2 in entry:
+                p = p1 + p2
+                if p > 1:
+                    continue
+                key = (m1 + m2, p)
+                if nxt.get(key, -1) < t1 + t2:
+                    nxt[key] = t1 + t2
+                # end if
+            # end for
+        # end for
+        merged = nxt
+    # end for
+    res = 8
+    for (m, p), t in merged.items():
+        m = min(m + calls, 4)
+        res = min(res, 8 - 2*m - min(t, 4 - m) - p)
+    # end for
+    return res
+# end def
+
+'''
+All the best ways to break up one suit, as {(m, p): most t}. Goes through the
+lowest tile left, trying it in a meld, pair, partial meld or on its own.
+'''
+def _split(counts, honors, memo):
+    if counts in memo:
+        return memo[counts]
+    i = next((i for i, c in enumerate(counts) if c), None)
+    if i is None:
+        return {(0, 0): 0}
+    c = list(counts)
+    options = []    # (counts left, m, p, t) for each way to use tile i
+    
+    def take(idxs, m, p, t):
+        left = c[:]
+        for j in idxs:
+            left[j] -= 1
+        options.append((bytes(left), m, p, t))
+    # end def
+    
+    if c[i] >= 3:
+        take((i, i, i), 1, 0, 0)
+    if c[i] >= 2:
+        take((i, i), 0, 1, 0)
+        take((i, i), 0, 0, 1)
+    # end if
+    if not honors:
+        if i + 2 < len(c) and c[i + 1] and c[i + 2]:
+            take((i, i + 1, i + 2), 1, 0, 0)
+        if i + 1 < len(c) and c[i + 1]:
+            take((i, i + 1), 0, 0, 1)
+        if i + 2 < len(c) and c[i + 2]:
+            take((i, i + 2), 0, 0, 1)
+    # end if
+    take((i,), 0, 0, 0)
+    
+    res = {}
+    for left, m, p, t in options:
+        for (m2, p2), t2 in _split(left, honors, memo).items():
+            if p + p2 > 1:
+                continue
+            key = (m + m2, p + p2)
+            if res.get(key, -1) < t + t2:
+                res[key] = t + t2
+            # end if
+        # end for
+    # end for
+    memo[counts] = res
+    return res
+# end def
+
+'''
+Shanten of a chiitoitsu (seven pairs) hand from the closed tile counts.
+'''
+def chiitoi_shanten(closed):
+    pairs = sum(1 for c in closed if c >= 2)
+    kinds = sum(1 for c in closed if c)
+    return 6 - pairs + max(0, 7 - kinds)
+# end def
+
+'''
+Shanten of a kokushi (thirteen orphans) hand from the closed tile counts.
+'''
+def kokushi_shanten(closed):
+    kinds = sum(1 for i in TERMINALS if closed[i])
+    pair = any(closed[i] >= 2 for i in TERMINALS)
+    return 13 - kinds - pair
+# end def
+
+'''
+Work out the shanten of every hand in a list of hand data, in one pass.
+Hands that can't be parsed get None.
+'''
+def batch_shanten(hands):
+    res = []
+    for hand in hands:
+        try:
+            res.append(shanten(hand["hand"]))
+        except MpszError:
+            res.append(None)
+        # end try
+    # end for
+    return res
+# end def
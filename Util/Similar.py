@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:48:15 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Finds the saved hands that looked most like a hand being entered. Every
+hand's final and dealt tiles are kept as 34 slot count vectors in NumPy
+matrices, so a search is one vectorized pass over all of them. Hands are
+compared by the L1 distance of their counts, the number of tiles that would
+have to be swapped in or out to turn one into the other. Needs NumPy, and
+doesn't touch tkinter so it can be used headless.
+"""
+import numpy as np
+from Util.HandModel import TILE_COUNT, parse, to_record
+from Util.MpszArray import read_counts
+
+# Distance given to a hand whose tiles couldn't be read, past any real one
+FAR = 1 << 14
+
+'''
+Count vectors of a list of hands, with a row per hand, and whether each one
+could be read. Field is "hand" or "start". The tiles are read all together
+by Util.MpszArray.
+'''
+def hand_vectors(hands, field):
+    return read_counts([str(hand[field]).strip().lower() for hand in hands])
+# end def
+
+'''
+Nearest neighbour search over the final and dealt hands of a list of hands.
+The matrices have room to spare, doubling when they fill up, so adding a
+hand is just writing a row. Hands are numbered in the order they were added.
+'''
+class SimilarHands:
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.clear()
+
+    '''
+    Forget every hand.
+    '''
+    def clear(self):
+        self.size = 0           # Rows in use
+        self.records = []       # HandRecord of each row
+        # Counts of the final hand then the dealt hand, side by side
+        self.counts = np.zeros((self.capacity, 2*TILE_COUNT), dtype=np.int16)
+        # Whether the final and dealt hands of each row could be read
+        self.valid = np.zeros((self.capacity, 2), dtype=bool)
+    # end def
+
+    def add(self, hand):
+        self.extend([hand])
+
+    '''
+    Add a list of hands, reading their tiles in one go.
+    '''
+    def extend(self, hands):
+        hands = [to_record(hand) for hand in hands]
+        if not hands:
+            return
+        self.__reserve(self.size + len(hands))
+        end = self.size + len(hands)
+        for col, field in enumerate(("hand", "start")):
+            counts, valid = hand_vectors(hands, field)
+            self.counts[self.size:end,
+                        col*TILE_COUNT:(col + 1)*TILE_COUNT] = counts
+            self.valid[self.size:end, col] = valid
+        # end for
+        self.records += hands
+        self.size = end
+    # end def
+
+    '''
+    The k hands closest to a final hand, a dealt hand, or both, given as MPSZ
+    strings. With both, the distance is the sum of the two. Gives a list of
+    (distance, HandRecord), closest first. Raises MpszError for a hand that
+    isn't valid, and ValueError if neither is given.
+    '''
+    def query(self, hand=None, start=None, k=5):
+        if hand is None and start is None:
+            raise ValueError("Need a hand or a dealt hand to compare")
+        dist = np.zeros(self.size, dtype=np.int32)
+        for col, string in enumerate((hand, start)):
+            if string is None:
+                continue
+            target = np.frombuffer(parse(string).counts, dtype=np.uint8)
+            part = self.counts[:self.size,
+                               col*TILE_COUNT:(col + 1)*TILE_COUNT]
+            dist += np.abs(part - target.astype(np.int16)).sum(axis=1)
+            dist[~self.valid[:self.size, col]] += FAR
+        # end for
+        k = min(k, self.size)
+        if k <= 0:
+            return []
+        # Only the k closest need sorting, the last added first on a tie
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.lexsort((-nearest, dist[nearest]))]
+        return [(int(dist[i]), self.records[i]) for i in nearest
+                if dist[i] < FAR]
+    # end def
+
+    # Grow the matrices to fit at least size rows
+    def __reserve(self, size):
+        if size <= len(self.counts):
+            return
+        capacity = len(self.counts)
+        while capacity < size:
+            capacity *= 2
+        # end while
+        counts = np.zeros((capacity, 2*TILE_COUNT), dtype=np.int16)
+        counts[:self.size] = self.counts[:self.size]
+        valid = np.zeros((capacity, 2), dtype=bool)
+        valid[:self.size] = self.valid[:self.size]
+        self.counts, self.valid = counts, valid
+    # end def
+# end class
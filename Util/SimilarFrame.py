@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:58:40 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Side panel next to the input section listing the saved hands most like the
+one being entered, with how each of them turned out. The search itself is
+Similar.SimilarHands, this only shows what it found.
+"""
+import tkinter as tk
+from tkinter.font import Font as tkFont
+from Util.HandCanvas import HandCanvas
+from Util.HandIndex import RTN_WORDS
+from Util.HandModel import parse_flag
+
+class SimilarFrame:
+    def __init__(self, master, bg, tiles, rows=5, bd=0, relief='solid'):
+        self.bg = bg
+        self.tiles = tiles      # Tile images for the hands, kept small
+        self.rows = rows        # Most hands shown at once
+        self.font = tkFont(size=10)
+        self.frame = tk.Frame(master, bg=bg, bd=bd, relief=relief)
+        self.title = tk.Label(self.frame, bg=bg, text='Similar Hands',
+                              font=tkFont(size=12, weight='bold'))
+        self.message = tk.Label(self.frame, bg=bg, font=self.font,
+                                wraplength=250, justify='left')
+        self.hands = []         # [HandCanvas, Label] per row, made when needed
+        self.title.grid(row=0, column=0, sticky='w', padx=5)
+        self.frame.grid_columnconfigure(0, weight=1)
+        self.show_text("Type a hand or dealt hand to see similar ones.")
+
+    def get_frame(self):
+        return self.frame
+
+    '''
+    Show a list of (distance, HandRecord), closest first.
+    '''
+    def show(self, matches):
+        if not matches:
+            self.show_text("No similar hands saved yet.")
+            return
+        # end if
+        self.message.grid_forget()
+        for i, (dist, record) in enumerate(matches[:self.rows]):
+            if i == len(self.hands):
+                self.hands.append([HandCanvas(self.frame, record, self.tiles,
+                                              self.bg),
+                                   tk.Label(self.frame, bg=self.bg,
+                                            font=self.font, anchor='w')])
+            # end if
+            frame, label = self.hands[i]
+            frame.load(record)
+            label.configure(text=_outcome(dist, record))
+            frame.get_frame().grid(row=2*i + 1, column=0, sticky='w', padx=5)
+            label.grid(row=2*i + 2, column=0, sticky='w', padx=5,
+                       pady=(0, 5))
+        # end for
+        # Hide rows left over from a longer list
+        for frame, label in self.hands[len(matches):]:
+            frame.get_frame().grid_forget()
+            label.grid_forget()
+        # end for
+    # end def
+
+    '''
+    Show a message in place of the hands.
+    '''
+    def show_text(self, text):
+        for frame, label in self.hands:
+            frame.get_frame().grid_forget()
+            label.grid_forget()
+        # end for
+        self.message.configure(text=text)
+        self.message.grid(row=1, column=0, sticky='w', padx=5)
+    # end def
+# end class
+
+# One line on how a hand went, like "Won by ron: riichi (distance 2)"
+def _outcome(dist, record):
+    won = parse_flag(record.won) == 1
+    rtn = RTN_WORDS.get(str(record.rtn).strip().lower(), str(record.rtn))
+    res = "Won by " + rtn if won else "Lost ({})".format(rtn)
+    if str(record.yaku).strip():
+        res += ": " + str(record.yaku).strip()
+    return "{} (distance {})".format(res, dist)
+# end def
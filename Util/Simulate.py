@@ -0,0 +1,419 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 23:02:39 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Monte Carlo estimate of how winnable a dealt hand was. Each run shuffles the
+tiles that weren't seen (not in the hand or the dead tiles, like the dora
+indicators) into a wall and plays it out: the hand draws every fourth tile
+and keeps whichever tile leaves it closest to complete (most accepts on a
+tie), while the other three players' draws just leave the wall. A run counts
+as reaching tenpai if the hand ever gets there, and as a tsumo win if the
+hand draws its own winning tile. Ron isn't counted, as nothing models which
+tiles the other players would keep or throw. Yaku are left out, so the tsumo
+rate is an upper bound on winning by tsumo alone.
+
+Runs are split into batches over a pool of processes. Each batch has its own
+random stream seeded from the hand's hash, so the same hand always gives the
+same estimate however many processes there are. The processes are spawned
+rather than forked, as the app runs them next to Tk and its task thread.
+"""
+import concurrent.futures
+import multiprocessing
+import random
+from Util.HandModel import MpszError, TILE_COUNT, hand_hash, parse
+from Util.Shanten import TERMINALS, suit_table
+from Util.Ukeire import SUIT_RANGES
+
+# Tiles left to draw after the deal and the dealer's first draw
+WALL = 69
+# Most merges to remember before starting over
+MEMO_SIZE = 1 << 18
+# Suit table entries merged for every suit but one, keyed by the suit left
+# out and the counts of the others, and standard shanten keyed by the merged
+# suits' key, the last suit's counts and the calls
+_rests = {}
+_scores = {}
+_TERMINAL_SET = frozenset(TERMINALS)
+
+'''
+Totals over a number of runs. Results of batches can be added together.
+'''
+class SimResult:
+    __slots__ = ('trials', 'tenpai', 'wins')
+
+    def __init__(self, trials=0, tenpai=0, wins=0):
+        self.trials = trials    # Runs played out
+        self.tenpai = tenpai    # Runs that reached tenpai
+        self.wins = wins        # Runs won by tsumo
+
+    def __add__(self, other):
+        return SimResult(self.trials + other.trials,
+                         self.tenpai + other.tenpai, self.wins + other.wins)
+
+    def tenpai_rate(self):
+        return self.tenpai/self.trials if self.trials else 0.0
+
+    def tsumo_rate(self):
+        return self.wins/self.trials if self.trials else 0.0
+# end class
+
+'''
+Play out a number of runs of a hand in this process. start is the MPSZ
+string to start from, 13 tiles (to draw first) or 14 (to discard first) less
+3 per call, dead the MPSZ string of tiles known to be out of the wall, and
+wall the number of tiles left for everyone to draw. seed can be anything
+random.Random takes. Raises MpszError if start isn't valid MPSZ, and
+ValueError if it's any other size. A start that's already complete wins
+every run.
+'''
+def simulate(start, dead='', wall=WALL, trials=500, seed=0):
+    hand = parse(start)
+    if _check_size(hand) == 14 and _complete(list(hand.closed),
+                                             len(hand.calls)):
+        # Already won with the tiles dealt, every run is a win
+        return SimResult(trials, trials, trials)
+    # end if
+    seen = list(hand.counts)
+    if dead:
+        for i, c in enumerate(parse(dead).counts):
+            seen[i] += c
+        # end for
+    # end if
+    unseen = [i for i in range(TILE_COUNT) for _ in range(max(0, 4 - seen[i]))]
+    wall = min(wall, len(unseen))
+    calls = len(hand.calls)
+    rng = random.Random(seed)
+    res = SimResult()
+    for _ in range(trials):
+        rng.shuffle(unseen)
+        tenpai, won = _play(list(hand.closed), calls, unseen, wall, seen[:])
+        res.trials += 1
+        res.tenpai += tenpai
+        res.wins += won
+    # end for
+    return res
+# end def
+
+'''
+The starting point for simulating a stored hand, as (start, dead, wall):
+its dealt hand, its dora indicators, and the wall left after the deal.
+Raises MpszError if the dealt hand isn't valid MPSZ, and ValueError if it
+isn't 13 or 14 tiles.
+'''
+def hand_setup(data):
+    start = str(data["start"]).strip().lower()
+    hand = parse(start)
+    size = _check_size(hand)
+    dora = str(data.get("dora", '')).strip().lower()
+    try:
+        parse(dora)
+    except MpszError:
+        dora = ''
+    # end try
+    # A 13 tile deal still has the first draw to come
+    wall = WALL
+    if size == 13:
+        wall += 1
+    # end if
+    return start, dora, wall
+# end def
+
+'''
+Runs simulations of stored hands on a pool of processes, and keeps the
+results by hand_hash so a hand only ever gets simulated once.
+'''
+class Simulator:
+    def __init__(self, trials=500, batch=50, workers=None, seed=0):
+        self.trials = trials    # Runs per hand
+        self.batch = batch      # Runs per task handed to a process
+        self.workers = workers  # Processes in the pool, None for one per CPU
+        self.seed = seed        # Base of every batch's seed
+        self.pool = None        # Started on the first simulation
+        self.results = {}       # hand_hash -> SimResult
+
+    '''
+    The result for a hand if it's been simulated, otherwise None.
+    '''
+    def cached(self, data):
+        return self.results.get(hand_hash(data))
+
+    '''
+    Start simulating a hand, returning a SimJob to check on. Raises
+    ValueError (or MpszError) if the hand can't be simulated.
+    '''
+    def submit(self, data):
+        key = hand_hash(data)
+        if key in self.results:
+            return SimJob(self, key, [])
+        start, dead, wall = hand_setup(data)
+        if self.pool is None:
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context("spawn"))
+        # end if
+        futures = []
+        for i, first in enumerate(range(0, self.trials, self.batch)):
+            trials = min(self.batch, self.trials - first)
+            seed = "{}:{}:{}".format(self.seed, key, i)
+            futures.append(self.pool.submit(simulate, start, dead, wall,
+                                            trials, seed))
+        # end for
+        return SimJob(self, key, futures)
+    # end def
+
+    '''
+    Simulate a hand and wait for the result.
+    '''
+    def run(self, data):
+        return self.submit(data).result()
+
+    '''
+    Stop the pool, dropping any batches that haven't started.
+    '''
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        # end if
+    # end def
+# end class
+
+'''
+A hand being simulated. Check done() before asking for the result() if it
+shouldn't block.
+'''
+class SimJob:
+    def __init__(self, simulator, key, futures):
+        self.simulator = simulator
+        self.key = key
+        self.futures = futures
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def result(self):
+        if self.key not in self.simulator.results:
+            res = SimResult()
+            for future in self.futures:
+                res += future.result()
+            # end for
+            self.simulator.results[self.key] = res
+        # end if
+        return self.simulator.results[self.key]
+    # end def
+# end class
+
+# Play out one shuffled wall, giving (reached tenpai, won by tsumo) as 0 or 1
+def _play(closed, calls, wall, size, seen):
+    tenpai = 0
+    if (sum(closed) + 3*calls) % 3 == 2:
+        sh, waits = _discard(closed, calls, seen)
+    else:
+        sh, waits = _accepts(closed, calls)
+    # end if
+    pos = 0
+    while pos < size:
+        if sh == 0:
+            tenpai = 1
+        # Own draw
+        tile = wall[pos]; pos += 1
+        if sh == 0 and tile in waits:
+            return 1, 1
+        closed[tile] += 1
+        seen[tile] += 1
+        sh, waits = _discard(closed, calls, seen)
+        # The other three players draw, their tiles mostly end up discarded
+        for tile in wall[pos:min(pos + 3, size)]:
+            seen[tile] += 1
+        # end for
+        pos += 3
+    # end while
+    return tenpai or int(sh == 0), 0
+# end def
+
+# Size of a dealt hand counting each call as 3 tiles, 13 or 14, raising
+# ValueError for any other
+def _check_size(hand):
+    size = sum(hand.closed) + 3*len(hand.calls)
+    if size not in (13, 14):
+        raise ValueError("Dealt hand has {} tiles, not 13 or 14".format(size))
+    return size
+# end def
+
+# Whether a 14 tile hand is already complete
+def _complete(closed, calls):
+    if _score(_rest(closed, 0), bytes(closed[0:9]), calls) < 0:
+        return True
+    special = None if calls else _special(closed)
+    return special is not None and \
+        _special_shanten(special, None, 0, 0) < 0
+# end def
+
+# Throw away the tile that leaves the lowest shanten, breaking ties by the
+# most unseen accepts. Gives the shanten and accepts of what's left.
+def _discard(closed, calls, seen):
+    _check_memo()
+    special = None if calls else _special(closed)
+    best = None; options = []
+    for s, (lo, hi) in enumerate(SUIT_RANGES):
+        rest = _rest(closed, s)
+        for i in range(lo, hi):
+            c = closed[i]
+            if not c:
+                continue
+            closed[i] = c - 1
+            sh = _score(rest, bytes(closed[lo:hi]), calls)
+            closed[i] = c
+            if special is not None:
+                sh = min(sh, _special_shanten(special, i, c, -1))
+            if best is None or sh < best:
+                best, options = sh, [i]
+            elif sh == best:
+                options.append(i)
+            # end if
+        # end for
+    # end for
+    pick = None
+    for i in options:
+        closed[i] -= 1
+        sh, acc = _accepts(closed, calls)
+        closed[i] += 1
+        count = sum(max(0, 4 - seen[t]) for t in acc)
+        if pick is None or count > pick[0]:
+            pick = (count, i, sh, acc)
+        # end if
+    # end for
+    count, i, sh, acc = pick
+    closed[i] -= 1
+    return sh, acc
+# end def
+
+# Shanten of a hand waiting on a draw, and the tiles that would lower it
+def _accepts(closed, calls):
+    _check_memo()
+    special = None if calls else _special(closed)
+    current = _score(_rest(closed, 0), bytes(closed[0:9]), calls)
+    if special is not None:
+        current = min(current, _special_shanten(special, None, 0, 0))
+    res = set()
+    for s, (lo, hi) in enumerate(SUIT_RANGES):
+        rest = _rest(closed, s)
+        for i in range(lo, hi):
+            c = closed[i]
+            if c >= 4:
+                continue
+            if special is not None and \
+                    _special_shanten(special, i, c, 1) < current:
+                res.add(i)
+                continue
+            # end if
+            # A tile with nothing of its suit within two of it can't join
+            # anything, so it can't help a standard hand
+            near = closed[i] if s == 3 else \
+                any(closed[max(lo, i - 2):min(hi, i + 3)])
+            if not near:
+                continue
+            closed[i] = c + 1
+            sh = _score(rest, bytes(closed[lo:hi]), calls)
+            closed[i] = c
+            if sh < current:
+                res.add(i)
+            # end if
+        # end for
+    # end for
+    return current, res
+# end def
+
+# Every suit's entry but suit s merged together, as (key, (m, p, t) options)
+def _rest(closed, s):
+    lo, hi = SUIT_RANGES[s]
+    key = (s, bytes(closed[:lo]) + bytes(closed[hi:]))
+    rest = _rests.get(key)
+    if rest is None:
+        merged = {(0, 0): 0}
+        for j, (a, b) in enumerate(SUIT_RANGES):
+            if j == s:
+                continue
+            entry = suit_table(closed[a:b])
+            nxt = {}
+            for (m1, p1), t1 in merged.items():
+                for m2, p2, t2 in entry:
+                    p = p1 + p2
+                    if p > 1:
+                        continue
+                    if nxt.get((m1 + m2, p), -1) < t1 + t2:
+                        nxt[(m1 + m2, p)] = t1 + t2
+                    # end if
+                # end for
+            # end for
+            merged = nxt
+        # end for
+        rest = _rests[key] = (key, tuple((m, p, t)
+                                         for (m, p), t in merged.items()))
+    # end if
+    return rest
+# end def
+
+# Standard shanten of the merged other suits plus one suit's counts, scored
+# the same way as blocks_shanten
+def _score(rest, counts, calls):
+    key = (rest[0], counts, calls)
+    res = _scores.get(key)
+    if res is None:
+        res = 8
+        entry = suit_table(counts)
+        for m1, p1, t1 in rest[1]:
+            for m2, p2, t2 in entry:
+                p = p1 + p2
+                if p > 1:
+                    continue
+                # Same as blocks_shanten, written out as it's the hot loop
+                m = m1 + m2 + calls
+                if m > 4:
+                    m = 4
+                t = t1 + t2
+                if t > 4 - m:
+                    t = 4 - m
+                if 8 - 2*m - t - p < res:
+                    res = 8 - 2*m - t - p
+                # end if
+            # end for
+        # end for
+        _scores[key] = res
+    # end if
+    return res
+# end def
+
+# Counts chiitoitsu and kokushi shanten are worked out from: (pairs, kinds,
+# terminal kinds, terminal pairs)
+def _special(closed):
+    return (sum(1 for c in closed if c >= 2), sum(1 for c in closed if c),
+            sum(1 for i in TERMINALS if closed[i]),
+            sum(1 for i in TERMINALS if closed[i] >= 2))
+# end def
+
+# Lowest of chiitoitsu and kokushi shanten once tile i, of which there are c,
+# has been added (step 1) or taken away (step -1)
+def _special_shanten(special, i, c, step):
+    pairs, kinds, tkinds, tpairs = special
+    if step > 0:
+        kind, pair = c == 0, c == 1
+    else:
+        kind, pair = c == 1, c == 2
+    # end if
+    kind *= step; pair *= step
+    pairs += pair; kinds += kind
+    if i in _TERMINAL_SET:
+        tkinds += kind; tpairs += pair
+    # end if
+    return min(6 - pairs + max(0, 7 - kinds), 13 - tkinds - (tpairs > 0))
+# end def
+
+# Start the memos over once they get big
+def _check_memo():
+    if len(_scores) + len(_rests) >= MEMO_SIZE:
+        _scores.clear()
+        _rests.clear()
+    # end if
+# end def
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 16:37:03 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Statistics over the hand history. The hands get turned into NumPy columns
+once, with the tiles read by Util.MpszArray, then each aggregate is a few
+vectorized passes over them. Needs NumPy,
+and doesn't touch tkinter so it can be used headless:
+
+    print(HandStats(store.load()).report())
+"""
+import numpy as np
+from Util.HandModel import parse_flag, tile_name
+from Util.MpszArray import read_counts, shanten_column
+
+# What each way of entering Ron/Tsumo/Hit/NA is counted as
+RTN_NAMES = {'r': 'Ron', 'ron': 'Ron', 't': 'Tsumo', 'tsumo': 'Tsumo',
+             'h': 'Hit', 'hit': 'Hit', 'n': 'N/A', 'na': 'N/A', 'n/a': 'N/A'}
+
+'''
+Columns of hand data and the aggregates over them. Text columns (yaku, rtn)
+are stored as codes into a list of labels.
+'''
+class HandStats:
+    def __init__(self, hands):
+        hands = list(hands)
+        self.count = len(hands)
+        self.won = _flags([h["won"] for h in hands])
+        self.furiten = _flags([h["furiten"] for h in hands])
+        self.left = np.array([_to_int(h["left"]) for h in hands],
+                             dtype=np.int32)
+        self.yakuNames, self.yaku = _encode(
+                            [str(h["yaku"]).strip().lower() for h in hands])
+        self.rtnNames, self.rtn = _encode(
+                            [RTN_NAMES.get(str(h["rtn"]).lower(), '?')
+                             for h in hands])
+        # Shanten of the dealt hand, -99 where it couldn't be worked out
+        deal, valid = shanten_column([h["start"] for h in hands])
+        self.dealShanten = np.where(valid, deal, -99).astype(np.int32)
+        # One row per hand, one column per tile, set where the tile was a wait
+        self.waits = read_counts([h["accepts"] for h in hands])[0] > 0
+    # end def
+    
+    '''
+    Overall (hands, wins, win rate).
+    '''
+    def overall(self):
+        wins = int(self.won.sum())
+        return self.count, wins, wins/self.count if self.count else 0.0
+    
+    '''
+    Win rate for each yaku, as a list of (yaku, hands, wins, rate) with the
+    most played first.
+    '''
+    def by_yaku(self):
+        return _rates(self.yakuNames, self.yaku, self.won)
+    
+    '''
+    Win rate for each of Ron/Tsumo/Hit/NA, as (label, hands, wins, rate).
+    '''
+    def by_rtn(self):
+        return _rates(self.rtnNames, self.rtn, self.won)
+    
+    '''
+    Win rate in and out of furiten, as (label, hands, wins, rate).
+    '''
+    def by_furiten(self):
+        return _rates(["Not furiten", "Furiten"], self.furiten.astype(np.intp),
+                      self.won)
+    
+    '''
+    Win rate by the shanten of the dealt hand, as (shanten, hands, wins,
+    rate) from the lowest shanten up.
+    '''
+    def by_deal_shanten(self):
+        known = self.dealShanten > -99
+        values, codes = np.unique(self.dealShanten[known], return_inverse=True)
+        res = _rates([int(v) for v in values], codes, self.won[known])
+        return sorted(res)
+    # end def
+    
+    '''
+    How many hands ended with each number of tiles left in the wall, split by
+    won and lost. Gives (tiles left, won counts, lost counts) arrays. Hands
+    without a readable number of tiles left aren't counted.
+    '''
+    def left_distribution(self):
+        known = self.left >= 0
+        left = self.left[known]
+        size = int(left.max()) + 1 if len(left) else 0
+        won = np.bincount(left[self.won[known]], minlength=size)
+        lost = np.bincount(left[~self.won[known]], minlength=size)
+        return np.arange(size), won, lost
+    # end def
+    
+    '''
+    The k tiles most often waited on, as a list of (tile, hands waiting on
+    it, win rate of those hands).
+    '''
+    def common_waits(self, k=10):
+        hands = self.waits.sum(axis=0)
+        wins = self.waits[self.won].sum(axis=0)
+        order = np.argsort(-hands, kind='stable')[:k]
+        return [("".join(tile_name(i)), int(hands[i]),
+                 wins[i]/hands[i]) for i in order if hands[i]]
+    # end def
+    
+    '''
+    Put every aggregate together into a plain text report.
+    '''
+    def report(self):
+        hands, wins, rate = self.overall()
+        lines = ["Hands: {}  Won: {}  Win rate: {:.1%}".format(hands, wins,
+                                                               rate)]
+        for title, rows in (("Yaku", self.by_yaku()),
+                            ("Ron/Tsumo", self.by_rtn()),
+                            ("Furiten", self.by_furiten()),
+                            ("Shanten at deal", self.by_deal_shanten())):
+            lines += ["", title]
+            lines += ["  {:<16} {:>6} hands {:>6} won {:>7.1%}".format(
+                          str(label), n, w, r) for label, n, w, r in rows]
+        # end for
+        lines += ["", "Most common waits"]
+        lines += ["  {:<16} {:>6} hands {:>14.1%}".format(tile, n, r)
+                  for tile, n, r in self.common_waits()]
+        left, won, lost = self.left_distribution()
+        lines += ["", "Tiles left  won  lost"]
+        lines += ["  {:>8} {:>5} {:>5}".format(l, w, o)
+                  for l, w, o in zip(left, won, lost) if w or o]
+        return "\n".join(lines)
+    # end def
+# end class
+
+'''
+Win counts and rates for each code of a column, as (label, hands, wins,
+rate), most hands first.
+'''
+def _rates(labels, codes, won):
+    hands = np.bincount(codes, minlength=len(labels))
+    wins = np.bincount(codes, weights=won, minlength=len(labels))
+    order = np.argsort(-hands, kind='stable')
+    return [(labels[i], int(hands[i]), int(wins[i]), wins[i]/hands[i])
+            for i in order if hands[i]]
+# end def
+
+# Turn a list of labels into (sorted unique labels, code array)
+def _encode(values):
+    index = {}
+    codes = np.array([index.setdefault(v, len(index)) for v in values],
+                     dtype=np.intp)
+    labels = sorted(index)
+    # Codes in order of first use, renumbered to the sorted labels
+    order = np.empty(len(labels), dtype=np.intp)
+    order[[index[label] for label in labels]] = np.arange(len(labels))
+    return labels, order[codes]
+# end def
+
+# Whether each of a column of won/furiten values is set. There are only a few
+# distinct values, so each one is only parsed once.
+def _flags(values):
+    seen = {}
+    res = []
+    for value in values:
+        try:
+            flag = seen[value]
+        except KeyError:
+            flag = seen[value] = parse_flag(value) == 1
+        except TypeError:
+            flag = parse_flag(value) == 1
+        # end try
+        res.append(flag)
+    # end for
+    return np.array(res, dtype=bool)
+# end def
+
+# Read an int field that may have been saved as text, -1 if it isn't one
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+    # end try
+# end def
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 20:41:06 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Runs slow work, like reading and writing the save, on a background thread so
+the window doesn't freeze. Tk isn't thread safe, so the worker never touches
+a widget: results are put on a queue, and the main thread picks them up from
+the event loop and hands them to a callback.
+"""
+import queue
+import threading
+import traceback
+
+'''
+A single worker thread with a queue of results polled from the Tk event
+loop. Tasks run one at a time in the order they were submitted, so they can
+share something like a store without stepping on each other.
+'''
+class TaskRunner:
+    def __init__(self, master, poll=50):
+        self.master = master        # Widget whose event loop gets the results
+        self.poll = poll            # Milliseconds between checks for results
+        self.tasks = queue.Queue()  # (func, args, done, error) to run
+        self.results = queue.Queue()    # (callback, value) to hand back
+        self.outstanding = 0        # Tasks submitted but not handed back yet
+        self.worker = threading.Thread(target=self.__run, daemon=True,
+                                       name="TaskRunner")
+        self.worker.start()
+        self.master.after(self.poll, self.__check)
+
+    '''
+    Run func(*args) on the worker. When it finishes, done gets called on the
+    main thread with what it returned, or error with the exception it raised.
+    Without an error callback, the traceback gets printed.
+    '''
+    def submit(self, func, *args, done=None, error=None):
+        self.outstanding += 1
+        self.tasks.put((func, args, done, error))
+    # end def
+
+    '''
+    Are there tasks that haven't finished and been handed back yet?
+    '''
+    def busy(self):
+        return self.outstanding > 0
+
+    '''
+    Block until every submitted task has finished, handing back their results
+    straight away. Used when the app can't carry on until the work is done,
+    such as the last save before closing.
+    '''
+    def wait(self):
+        while self.outstanding:
+            self.__hand_back(*self.results.get())
+        # end while
+    # end def
+
+    '''
+    Finish the outstanding tasks and stop the worker.
+    '''
+    def shutdown(self):
+        self.wait()
+        self.tasks.put(None)
+        self.worker.join()
+    # end def
+
+    # Worker loop, runs each task and queues up what came of it
+    def __run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            func, args, done, error = task
+            try:
+                self.results.put((done, func(*args), None))
+            except Exception as exc:
+                self.results.put((error, None, exc))
+            # end try
+        # end while
+    # end def
+
+    # Hand back any results that are in, then check again after poll ms
+    def __check(self):
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # end try
+            self.__hand_back(*result)
+        # end while
+        self.master.after(self.poll, self.__check)
+    # end def
+
+    # Give a finished task's result or exception to its callback
+    def __hand_back(self, callback, value, exc):
+        self.outstanding -= 1
+        if exc is not None:
+            if callback is None:
+                traceback.print_exception(exc)
+            else:
+                callback(exc)
+            # end if
+        elif callback is not None:
+            callback(value)
+        # end if
+    # end def
+# end class
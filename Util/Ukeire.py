@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 15:48:20 2026
+
+@author: Giovanni "Veirya" Oliver
+
+Ukeire (accepts) for a hand: which draws would lower its shanten, and how
+many of each are still unseen after the hand, dora indicators and discards.
+
+Each candidate draw only changes one suit, so the other three suits' table
+entries from Util.Shanten are reused as-is rather than redoing the whole
+hand for each of the 34 tiles.
+"""
+from Util.HandModel import (Hand, parse, to_mpsz, hand_hash, MpszError,
+                            TILE_COUNT)
+from Util.Shanten import (suit_blocks, suit_table, blocks_shanten,
+                          chiitoi_shanten, kokushi_shanten)
+
+# Index range of each suit's slice of the 34 slot counts
+SUIT_RANGES = ((0, 9), (9, 18), (18, 27), (27, 34))
+
+'''
+Result of an ukeire check.
+    shanten: Shanten of the hand before drawing.
+    tiles:   {tile index: copies still unseen} for each accepted draw.
+'''
+class Ukeire:
+    __slots__ = ('shanten', 'tiles')
+    
+    def __init__(self, shanten, tiles):
+        self.shanten = shanten
+        self.tiles = tiles
+    
+    '''
+    Total number of unseen tiles that would be accepted.
+    '''
+    def count(self):
+        return sum(self.tiles.values())
+    
+    '''
+    The accepted tiles in MPSZ notation, e.g. for the accepts field.
+    '''
+    def mpsz(self):
+        counts = [0]*TILE_COUNT
+        for idx in self.tiles:
+            counts[idx] = 1
+        # end for
+        return to_mpsz(counts)
+    # end def
+# end class
+
+'''
+Work out the ukeire of a hand. Takes the hand and optionally the dora
+indicators and discards seen, each as a Hand or MPSZ string. A hand that has
+just drawn (14 tiles less 3 per call) gets the accepts of its best discards
+put together.
+'''
+def ukeire(hand, dora='', discards=''):
+    if not isinstance(hand, Hand):
+        hand = parse(hand)
+    seen = list(hand.counts)
+    for extra in (dora, discards):
+        if extra:
+            extra = extra if isinstance(extra, Hand) else parse(extra)
+            for i, c in enumerate(extra.counts):
+                seen[i] += c
+            # end for
+        # end if
+    # end for
+    
+    closed = list(hand.closed)
+    calls = len(hand.calls)
+    if (sum(closed) + 3*calls) % 3 != 2:
+        best, accepts = _accepts(closed, calls)
+    else:
+        # Try each discard, keeping the accepts of whichever leave the hand
+        # closest to complete
+        best = 8; accepts = set()
+        for i in range(TILE_COUNT):
+            if not closed[i]:
+                continue
+            closed[i] -= 1
+            sh, acc = _accepts(closed, calls)
+            closed[i] += 1
+            if sh < best:
+                best, accepts = sh, set(acc)
+            elif sh == best:
+                accepts |= acc
+            # end if
+        # end for
+    # end if
+    return Ukeire(best, {i: max(0, 4 - seen[i]) for i in sorted(accepts)})
+# end def
+
+'''
+Shanten of a set of closed tiles and the set of tile indices that lower it.
+Only the suit a draw lands in gets looked up again.
+'''
+def _accepts(closed, calls):
+    blocks = suit_blocks(closed)
+    closedOnly = not calls
+    current = _shanten(blocks, closed, calls, closedOnly)
+    res = set()
+    for s, (lo, hi) in enumerate(SUIT_RANGES):
+        others = blocks[:]
+        for i in range(lo, hi):
+            if closed[i] >= 4:
+                continue
+            closed[i] += 1
+            others[s] = suit_table(closed[lo:hi])
+            if _shanten(others, closed, calls, closedOnly) < current:
+                res.add(i)
+            closed[i] -= 1
+        # end for
+    # end for
+    return current, res
+# end def
+
+# Lowest shanten over the hand types, from already looked up suit blocks
+def _shanten(blocks, closed, calls, closedOnly):
+    res = blocks_shanten(blocks, calls)
+    if closedOnly:
+        res = min(res, chiitoi_shanten(closed), kokushi_shanten(closed))
+    return res
+# end def
+
+'''
+Go through a list of hand data, yielding (index, Ukeire) for each hand, or
+(index, None) for hands that can't be parsed. Being a generator, it can be
+run a few hands at a time to keep a UI responsive. Results can be kept in a
+cache dict keyed by hand_hash, so hands that were already worked out are
+skipped the next time.
+'''
+def batch_ukeire(hands, cache=None):
+    for i, hand in enumerate(hands):
+        key = None if cache is None else hand_hash(hand)
+        if key is not None and key in cache:
+            yield i, cache[key]
+            continue
+        # end if
+        try:
+            res = ukeire(hand["hand"], hand.get("dora", ''))
+        except MpszError:
+            res = None
+        # end try
+        if cache is not None:
+            cache[key] = res
+        # end if
+        yield i, res
+    # end for
+# end def
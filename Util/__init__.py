@@ -1,6 +1,23 @@
 # -*- coding: utf-8 -*-
 
-import Util.HandFrame
-import Util.tilePngs
-import Util.HandViewer
-import Util.InputFrame
\ No newline at end of file
+import importlib
+import Util.Instrument
+import Util.HandModel
+import Util.Shanten
+import Util.Ukeire
+import Util.HandArchive
+import Util.HandStore
+import Util.HandIndex
+import Util.Tasks
+import Util.Simulate
+
+# Modules for the display need tkinter, so they're only imported on first use.
+# Keeps the rest of Util usable headless, such as from mahjongcli.
+TK_MODULES = ('HandFrame', 'HandCanvas', 'tilePngs', 'HandViewer',
+              'InputFrame', 'SimilarFrame')
+
+def __getattr__(name):
+    if name in TK_MODULES:
+        return importlib.import_module('Util.' + name)
+    raise AttributeError("module 'Util' has no attribute " + repr(name))
+# end def
\ No newline at end of file
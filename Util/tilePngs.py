@@ -7,15 +7,149 @@ Created on Sun Aug 18 15:15:56 2024
 Imports the tile images for MahjongTracker as tkinter PhotoImages.
 Image credits to FluffyStuff @github
 https://github.com/FluffyStuff/riichi-mahjong-tiles/tree/master
+
+Decoding and downscaling every PNG is slow, so the scaled tiles are also kept
+in a single sprite atlas per scale under CACHE. Later launches load the atlas
+and slice it back up, and it gets rebuilt whenever the tile art changes.
+TileProvider reads tiles out of the atlas file lazily, one tile at a time,
+without keeping the whole atlas image around.
 """
 
-from tkinter import PhotoImage
+from tkinter import PhotoImage, TclError
+from collections import OrderedDict
+from Util.Instrument import timed
+import hashlib
+import json
 import os
 import re
 LOC = "Resources/Tile_Graphics"
+CACHE = "Data/Cache"
 
 # Note that 'scale' is a downscaling factor.
+@timed("tiles.gen_img_table")
 def gen_img_table(scale=1):
+    key = _source_key(scale)
+    cached = _read_atlas(scale, key)
+    if cached is None:
+        res = _load_source(scale)
+        _write_atlas(res, scale, key)
+        print("Loaded tile graphics from {}.".format(LOC))
+    else:
+        atlas, tiles = cached
+        res = {'z':{}, 'm':{}, 'p':{}, 's':{}, 'b':{}}
+        for code, rect in tiles.items():
+            res[code[0]][code[1]] = _slice(atlas, rect)
+        # end for
+        print("Loaded tile graphics from cache.")
+    # end if
+    return res
+# end def
+
+'''
+Lazy stand-in for the table from gen_img_table. Tiles are looked up the same
+way, as provider[suit][digit], but each (suit, digit, scale) image is only
+made the first time it is asked for. Made images are kept in a LRU shared by
+every scale, holding at most maxSize of them, so switching between a few zoom
+levels doesn't keep a full tile set around for each. A missing tile is read
+on its own out of its scale's cached atlas file, so only its own pixels are
+held. Only the small index of where each tile sits is kept per scale. If
+the atlas couldn't be cached, the tile is decoded from its own graphic.
+'''
+class TileProvider:
+    def __init__(self, scale=1, maxSize=128, cache=None, indexes=None):
+        self.scale = scale      # Downscaling factor for lookups
+        self.maxSize = maxSize  # Most images to hold at once
+        # LRU of images keyed by (suit, digit, scale), shared between scales
+        self.cache = OrderedDict() if cache is None else cache
+        # Atlas file and tile index by scale, None if there's no atlas
+        self.indexes = {} if indexes is None else indexes
+    
+    def __getitem__(self, suit):
+        return _TileSuit(self, suit)
+    
+    '''
+    Get a provider for another scale that shares this one's images.
+    '''
+    def at_scale(self, scale):
+        return TileProvider(scale, self.maxSize, self.cache, self.indexes)
+    
+    '''
+    Get the image for a tile, making it if it isn't in the LRU. Images come
+    out of the scale's atlas file, which is built the first time it's needed.
+    '''
+    def get(self, suit, digit, scale=None):
+        scale = self.scale if scale is None else scale
+        key = (suit, digit, scale)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        # end if
+        index = self._index(scale)
+        if index is None:
+            img = _read_source(suit, digit, scale)
+        else:
+            img = _read_tile(index[0], index[1][suit + digit])
+        # end if
+        _store(self.cache, key, img, self.maxSize)
+        return img
+    # end def
+    
+    '''
+    Make sure the atlas for this scale is built, so the first hands drawn
+    don't have to wait on decoding every tile graphic.
+    '''
+    def preload(self):
+        self._index(self.scale)
+    
+    # Get the atlas file and tile index for a scale, building the atlas if
+    # needed. None if it couldn't be written.
+    @timed("tiles.atlas")
+    def _index(self, scale):
+        if scale in self.indexes:
+            return self.indexes[scale]
+        srcKey = _source_key(scale)
+        tiles = _read_index(scale, srcKey)
+        if tiles is None:
+            table = _load_source(scale)
+            _write_atlas(table, scale, srcKey)
+            # Already decoded everything, so may as well hold onto it
+            for cat in table:
+                for num, img in table[cat].items():
+                    _store(self.cache, (cat, num, scale), img, self.maxSize)
+                # end for
+            # end for
+            tiles = _read_index(scale, srcKey)
+        # end if
+        index = None if tiles is None else (_atlas_paths(scale)[0], tiles)
+        self.indexes[scale] = index
+        return index
+    # end def
+# end class
+
+# Add an entry to a LRU, dropping the least recently used past size
+def _store(cache, key, value, size):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+    # end while
+# end def
+
+# One suit of a TileProvider, so lookups can be chained as [suit][digit]
+class _TileSuit:
+    def __init__(self, provider, suit):
+        self.provider = provider
+        self.suit = suit
+    
+    def __getitem__(self, digit):
+        return self.provider.get(self.suit, digit)
+# end class
+
+'''
+Decode and downscale every tile graphic, keyed by MPSZ suit then digit.
+'''
+@timed("tiles.load_source")
+def _load_source(scale):
     directory = os.fsencode(LOC)
     res = {'z':{},
                    'm':{},
@@ -26,13 +160,133 @@ def gen_img_table(scale=1):
     
     for file in os.listdir(directory):
         fn = os.fsdecode(file)  # Get file name
-        cat = fn[0].lower()     # Tile category
-        # Tile number
-        num = '1' if fn[0] == 'B' else re.search(r'\d', fn).group()
+        cat, num = _tile_code(fn)
         # Generate a PhotoImage for the file assigned to the tile code
-        print("Adding {}/{} as {}{}".format(LOC, fn, cat, num))
         res[cat][num] = PhotoImage(file="{}/{}".format(LOC, fn)).subsample(scale)
     # end for
 
     return res
-# end def
\ No newline at end of file
+# end def
+
+'''
+Get the tile code of a tile graphic from its file name, as (suit, digit).
+'''
+def _tile_code(fn):
+    cat = fn[0].lower()     # Tile category
+    # Tile number
+    num = '1' if fn[0] == 'B' else re.search(r'\d', fn).group()
+    return cat, num
+# end def
+
+'''
+Hash the scale with the name, size and modified time of every tile graphic.
+Any change to the art gives a new key, which invalidates the cached atlas.
+'''
+def _source_key(scale):
+    sha = hashlib.sha1(str(scale).encode())
+    for fn in sorted(os.listdir(LOC)):
+        stat = os.stat("{}/{}".format(LOC, fn))
+        sha.update("{}:{}:{};".format(fn, stat.st_size,
+                                      stat.st_mtime_ns).encode())
+    # end for
+    return sha.hexdigest()
+# end def
+
+# Paths of the atlas image and its index for a given scale
+def _atlas_paths(scale):
+    base = "{}/tiles_x{}".format(CACHE, scale)
+    return base + ".png", base + ".json"
+
+'''
+Load the index of the cached atlas for a scale, the rectangle of each tile
+keyed by its code. Returns None if there's no atlas, it is unreadable, or it
+was built from other art.
+'''
+def _read_index(scale, key):
+    pngPath, idxPath = _atlas_paths(scale)
+    try:
+        with open(idxPath, 'r') as f:
+            index = json.load(f)
+        if index["key"] != key or not os.path.exists(pngPath):
+            return None
+        return index["tiles"]
+    except (OSError, ValueError, KeyError):
+        return None
+    # end try
+# end def
+
+'''
+Load the cached atlas for a scale, as the atlas image and its index of tile
+rectangles. Returns None if there's no atlas, it is unreadable, or it was
+built from other art.
+'''
+def _read_atlas(scale, key):
+    tiles = _read_index(scale, key)
+    if tiles is None:
+        return None
+    try:
+        return PhotoImage(file=_atlas_paths(scale)[0]), tiles
+    except TclError:
+        return None
+    # end try
+# end def
+
+# Read just the tile in rect, as [x, y, w, h], out of an atlas file
+@timed("tiles.read_tile")
+def _read_tile(path, rect):
+    x, y, w, h = rect
+    img = PhotoImage(width=w, height=h)
+    img.tk.call(img, 'read', path, '-from', x, y, x + w, y + h, '-to', 0, 0)
+    return img
+# end def
+
+# Decode and downscale the graphic of one tile
+@timed("tiles.read_source")
+def _read_source(suit, digit, scale):
+    for fn in os.listdir(LOC):
+        if _tile_code(fn) == (suit, digit):
+            return PhotoImage(file="{}/{}".format(LOC, fn)).subsample(scale)
+    # end for
+    raise KeyError(suit + digit)
+# end def
+
+# Cut the tile in rect, as [x, y, w, h], out of an atlas image
+@timed("tiles.slice")
+def _slice(atlas, rect):
+    x, y, w, h = rect
+    img = PhotoImage(width=w, height=h)
+    img.tk.call(img, 'copy', atlas, '-from', x, y, x + w, y + h, '-to', 0, 0)
+    return img
+# end def
+
+'''
+Pack the scaled tiles side by side into one image and write it to the cache,
+along with an index of where each tile sits. Returns the atlas image and the
+index. Failing to write the cache isn't fatal, it just means the next launch
+loads from source again.
+'''
+def _write_atlas(table, scale, key):
+    pngPath, idxPath = _atlas_paths(scale)
+    tiles = {}; x = 0; height = 0
+    for cat in table:
+        for num, img in table[cat].items():
+            tiles[cat + num] = [x, 0, img.width(), img.height()]
+            x += img.width(); height = max(height, img.height())
+        # end for
+    # end for
+    atlas = PhotoImage(width=x, height=height)
+    for code, (x, y, w, h) in tiles.items():
+        atlas.tk.call(atlas, 'copy', table[code[0]][code[1]], '-to', x, y)
+    # end for
+    try:
+        os.makedirs(CACHE, exist_ok=True)
+        atlas.write(pngPath, format='png')
+        # Index goes last, so a half written atlas is never picked up
+        with open(idxPath + ".tmp", 'w') as f:
+            json.dump({"key": key, "tiles": tiles}, f)
+        os.replace(idxPath + ".tmp", idxPath)
+    except (OSError, TclError):
+        print("Could not write tile cache to {}.".format(CACHE))
+    # end try
+    return atlas, tiles
+# end def
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 18 17:20:36 2026
+
+@author: Giovanni "Veirya" Oliver
+
+MahjongTracker CLI
+---------------------------------
+Headless companion to mahjongtracker.py for working with saved hands without
+a display. Never imports tkinter.
+
+    python mahjongcli.py import hands.jsonl     Validate and save hands
+    python mahjongcli.py check hands.txt        Only validate them
+    python mahjongcli.py stats                  Print the stats report
+    python mahjongcli.py export out.json        Write every hand as JSON
+    python mahjongcli.py export out.mja         Or as a binary archive
+
+Hands to import can be a JSON list (.json), JSON Lines (.jsonl), a binary
+archive (.mja, see Util.HandArchive), or a text file with one hand per line,
+either a JSON object or its fields in the order of HandModel.FIELDS separated
+by '|'. Blank shanten and accepts fields get worked out from the hand. Big
+imports are split into chunks and checked over a pool of processes.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+from Util.HandArchive import read_archive, write_archive
+from Util.HandModel import FIELDS, check_hand, hand_hash
+from Util.HandStore import open_store
+from Util.Shanten import shanten
+from Util.Ukeire import ukeire
+
+SAVE_FILE = "Data/saved_hands.shards"
+CHUNK = 5000    # Hands per chunk handed to a worker process
+
+'''
+Read the hand records in a file, giving a list of (label, record) and a list
+of errors for lines that couldn't be read. Labels say where each record came
+from, "line N" for text files and "hand N" counting from 1 for JSON lists and
+archives.
+'''
+def read_records(path):
+    if path.endswith(".json"):
+        with open(path, 'r') as f:
+            try:
+                return _numbered(json.load(f)), []
+            except json.JSONDecodeError as e:
+                return [], ["line {}: {} at column {}".format(
+                                                e.lineno, e.msg, e.colno)]
+            # end try
+        # end with
+    elif path.endswith(".mja"):
+        return _numbered(read_archive(path)), []
+    # end if
+    res = []; errors = []
+    with open(path, 'r') as f:
+        for num, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            elif line[0] in "[{":
+                # Anything JSON, prepare_hand turns away all but objects
+                try:
+                    res.append(("line {}".format(num), json.loads(line)))
+                except json.JSONDecodeError as e:
+                    errors.append("line {}: {} at column {}".format(
+                                                    num, e.msg, e.colno))
+                # end try
+            else:
+                res.append(("line {}".format(num),
+                            dict(zip(FIELDS, line.split('|')))))
+            # end if
+        # end for
+    # end with
+    return res, errors
+# end def
+
+# Label each record of a list by its place in it
+def _numbered(records):
+    return [("hand {}".format(num), record)
+            for num, record in enumerate(records, 1)]
+# end def
+
+'''
+Fill in blank shanten and accepts from the hand, then check the record.
+Returns the cleaned up hand, or raises ValueError, or TypeError if the record
+isn't a JSON object.
+'''
+def prepare_hand(record):
+    if not isinstance(record, dict):
+        raise TypeError("expected a JSON object, got " + type(record).__name__)
+    record = dict(record)
+    hand = str(record.get("hand", '')).lower().strip()
+    if str(record.get("shanten", '')).strip() == '':
+        record["shanten"] = shanten(hand)
+    if str(record.get("accepts", '')).strip() == '':
+        record["accepts"] = ukeire(hand, str(record.get("dora", ''))
+                                   .lower().strip()).mpsz()
+    # end if
+    return check_hand(record)
+# end def
+
+'''
+Prepare a chunk of (label, record), giving back (good hands, errors).
+Run in the worker processes.
+'''
+def prepare_chunk(chunk):
+    good = []; errors = []
+    for label, record in chunk:
+        try:
+            good.append(prepare_hand(record))
+        except (ValueError, TypeError, AttributeError) as e:
+            errors.append("{}: {}".format(label, e))
+        # end try
+    # end for
+    return good, errors
+# end def
+
+'''
+Prepare every record, spreading the chunks over a process pool when there's
+more than one chunk's worth and more than one worker.
+'''
+def prepare_all(records, workers):
+    chunks = [records[i:i + CHUNK] for i in range(0, len(records), CHUNK)]
+    if workers > 1 and len(chunks) > 1:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(prepare_chunk, chunks))
+    else:
+        results = [prepare_chunk(chunk) for chunk in chunks]
+    # end if
+    good = [hand for res in results for hand in res[0]]
+    errors = [err for res in results for err in res[1]]
+    return good, errors
+# end def
+
+def cmd_import(args, save=True):
+    records, errors = read_records(args.file)
+    good, bad = prepare_all(records, args.workers)
+    errors += bad
+    for err in errors:
+        print(err, file=sys.stderr)
+    # end for
+    print("{} valid hands, {} invalid.".format(len(good), len(errors)))
+    if not save or not good:
+        return 1 if errors else 0
+    store = open_store(args.save)
+    # The full list is only needed if the store rewrites everything
+    existing = store.load()
+    # Leave out hands that are already saved, or show up twice in the file
+    seen = {hand_hash(hand) for hand in existing}
+    new = []
+    for hand in good:
+        key = hand_hash(hand)
+        if key not in seen:
+            seen.add(key)
+            new.append(hand)
+        # end if
+    # end for
+    if len(new) < len(good):
+        print("Skipped {} duplicate hands.".format(len(good) - len(new)))
+    # end if
+    good = new
+    if not good:
+        store.close()
+        return 1 if errors else 0
+    # end if
+    store.extend(good)
+    store.save(lambda: existing + good)
+    store.close()
+    print("Saved to {}.".format(store.path))
+    return 1 if errors else 0
+# end def
+
+def cmd_check(args):
+    return cmd_import(args, save=False)
+
+def cmd_stats(args):
+    try:
+        from Util.Stats import HandStats
+    except ImportError:
+        print("Stats need NumPy to be installed.", file=sys.stderr)
+        return 1
+    # end try
+    store = open_store(args.save)
+    print(HandStats(store.load_parallel(args.workers)).report())
+    store.close()
+    return 0
+# end def
+
+def cmd_export(args):
+    store = open_store(args.save)
+    hands = store.load()
+    store.close()
+    if args.out.endswith(".mja"):
+        write_archive(args.out, hands)
+    else:
+        with open(args.out, 'w') as f:
+            json.dump(hands, f, indent=4)
+        # end with
+    # end if
+    print("Wrote {} hands to {}.".format(len(hands), args.out))
+    return 0
+# end def
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="mahjongcli",
+                                     description="Headless MahjongTracker.")
+    parser.add_argument("--save", default=SAVE_FILE,
+                        help="Save file, its extension picks the store "
+                             "(default: %(default)s)")
+    cmds = parser.add_subparsers(dest="cmd", required=True)
+    for name, func, text in (("import", cmd_import, "validate and save hands"),
+                             ("check", cmd_check, "only validate hands")):
+        cmd = cmds.add_parser(name, help=text)
+        cmd.add_argument("file", help="JSON, JSON Lines, archive or text "
+                                      "file of hands")
+        cmd.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                         help="processes to check hands with "
+                              "(default: %(default)s)")
+        cmd.set_defaults(func=func)
+    # end for
+    cmd = cmds.add_parser("stats", help="print the stats report")
+    cmd.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                     help="processes to read a sharded save with "
+                          "(default: %(default)s)")
+    cmd.set_defaults(func=cmd_stats)
+    cmd = cmds.add_parser("export", help="write every hand as a JSON list, "
+                                         "or an archive for a .mja file")
+    cmd.add_argument("out", help="JSON or .mja file to write")
+    cmd.set_defaults(func=cmd_export)
+    args = parser.parse_args(argv)
+    return args.func(args)
+# end def
+
+if __name__ == "__main__":
+    sys.exit(main())
+#end if
@@ -10,31 +10,67 @@ Pythong tool to help keep track of various mahjong hands I've had and how I
 lost/won the hand.
 """
 
-import json
+import argparse
+import time
 import traceback
 import tkinter as tk
 from tkinter.font import Font as tkFont
-from pathlib import Path
-from Util.tilePngs import gen_img_table
+from Util.tilePngs import TileProvider
 from Util.HandViewer import HandViewer
+from Util.HandCanvas import HandCanvas
 from Util.InputFrame import InputFrame
+from Util.SimilarFrame import SimilarFrame
+from Util.HandStore import open_store
+from Util.HandIndex import QueryError
+from Util.Tasks import TaskRunner
+from Util.HandModel import parse, MpszError
+from Util.Shanten import shanten
+from Util.Simulate import Simulator
+from Util.Ukeire import batch_ukeire
+from Util import Instrument
+from Util.Instrument import timed
+
+# Tile downscaling factors the Zoom button cycles through
+ZOOMS = (10, 8, 12)
+# Number of hands read in at a time
+PAGE_SIZE = 200
+# Seconds of analysis to run per event loop turn
+ANALYZE_SLICE = 0.02
+# Milliseconds between updates of the timing panel
+PERF_REFRESH = 2000
+# Milliseconds between checks on a running simulation
+SIM_POLL = 200
+# Number of similar hands shown next to the input section
+SIMILAR_COUNT = 5
 
 '''
 Core of the app, requiring a base tkinter window/root to use
 '''
 class MahjongTracker:
-    def __init__(self, master, tiles, sf, bg='gray66'):
+    def __init__(self, master, tiles, store, bg='gray66'):
         self.master = master
         self.tiles = tiles      # Map of tile images to MPSZ notation
-        self.sf = sf            # Save file for hands
+        self.zoom = 0           # Index of the current tile scale in ZOOMS
+        self.store = store      # HandStore the hands are saved to
         self.bg = bg            # Background color
-        self.addStatText = ''   # Used to set status text when adding hands
+        self.addStatText = tk.StringVar()   # Status text under the controls
+        self.perfText = tk.StringVar()      # Timings shown in the controls
+        self.filterText = tk.StringVar()    # Query in the filter bar
+        self.analysis = None    # State of a running hand analysis
+        self.analyzed = {}      # Ukeire of analyzed hands by hand_hash
+        self.tasks = TaskRunner(master)     # Reads and writes the store
+        self.ioBusy = False     # Is a load or save running in the background?
+        self.simulator = Simulator()    # Simulates clicked hands
+        self.simJob = None      # Simulation the status is waiting on
         self.buttonFont = tkFont(size=20, weight='bold')
         
         # Initialize sub-frames and their widgets
         ## Hand Display ##
-        # Displays the hands that have been loaded
-        self.handViewer = HandViewer(self.master, self.bg, bd=2)
+        # Displays the hands that have been loaded. Virtual mode only builds
+        # frames for the hands in view, so large histories stay quick, and
+        # drawing each hand on one canvas keeps it to a widget per hand.
+        self.handViewer = HandViewer(self.master, self.bg, bd=2, virtual=True,
+                                     backend=HandCanvas)
         
         ## Control Frame ##
         # Hosts the control buttons. Not encapsulated in its own class as the
@@ -56,9 +92,40 @@ class MahjongTracker:
                                       text='Reload', command=self._load_hands,
                                       height=2, font=self.buttonFont
                                       )
+        self.zoomButton = tk.Button(
+                                    self.controlFrame, bg='light gray',
+                                    text='Zoom', command=self._cycle_zoom,
+                                    height=2, font=self.buttonFont
+                                    )
+        self.analyzeButton = tk.Button(
+                                       self.controlFrame, bg='light gray',
+                                       text='Analyze',
+                                       command=self._analyze_hands, height=2,
+                                       font=self.buttonFont
+                                       )
+        self.statsButton = tk.Button(
+                                     self.controlFrame, bg='light gray',
+                                     text='Stats', command=self._show_stats,
+                                     height=2, font=self.buttonFont
+                                     )
+        self.filterLabel = tk.Label(
+                                    self.controlFrame, bg=self.bg,
+                                    text='Filter', font=('TkDefaultFont', 12)
+                                    )
+        self.filterInput = tk.Entry(
+                                    self.controlFrame, font=('TkDefaultFont', 12),
+                                    textvariable=self.filterText
+                                    )
+        self.filterText.trace_add('write', self._filter_hands)
+        self.perfStatus = tk.Label(
+                                   self.controlFrame, bg=self.bg,
+                                   textvariable=self.perfText, justify='left',
+                                   font=('Courier', 8), anchor='w'
+                                   )
         self.addStatus = tk.Label(
                                   self.controlFrame, bg=self.bg,
-                                  textvariable=self.addStatText
+                                  textvariable=self.addStatText,
+                                  wraplength=200
                                   )
         self.addButton = tk.Button(
                                    self.controlFrame, bg='light gray',
@@ -67,43 +134,332 @@ class MahjongTracker:
                                    )
         
         ## Input Frame ##
-        # Hosts the input fields, boxes, and buttons
-        self.inputFrame = InputFrame(self.master, bg=self.bg, bd=2)
+        # Hosts the input fields, boxes, and buttons, with the tile fields
+        # previewed using the same tiles as the hands
+        self.inputFrame = InputFrame(self.master, bg=self.bg, bd=2,
+                                     tiles=self.tiles)
+        
+        ## Similar Hands ##
+        # Lists the saved hands closest to the one being entered, drawn with
+        # the smallest tiles to fit beside the inputs. The search covers every
+        # saved hand, not just the loaded pages, so it gets filled from the
+        # store on the task thread. It needs NumPy, so without it the panel
+        # just says so.
+        self.similarFrame = SimilarFrame(self.master, self.bg,
+                                         self.tiles.at_scale(max(ZOOMS)),
+                                         rows=SIMILAR_COUNT, bd=2)
+        self.similarAdded = None    # Hands added while the search is filled
+        try:
+            from Util.Similar import SimilarHands
+            self.similar = SimilarHands()
+        except ImportError:
+            self.similar = None
+            self.similarFrame.show_text("Similar hands need NumPy to be "
+                                        "installed.")
+        # end try
+        self.inputFrame.bind_change(self._find_similar)
         
-        # Load any saved hands
-        self._load_hands()
+        # Saved hands get loaded once the window is up, see __start_up
+        self.pages = None           # Generator of older pages still to load
+        self.rest = None            # Older hands read in full but not shown
+        self.pageQueued = False     # Is a page waiting in the event loop?
+        self.loading = False        # Is the newest page being read?
+        self.unseen = []            # Hands added while it was being read
+        self.handViewer.bind_near_top(self._load_older)
+        self.handViewer.bind_click(self._simulate_hand)
         # Arrange and setup scaling for sub-frames
         self.__setup_subframes()
+        self.master.after_idle(self.__start_up)
 
     def get_root(self):
         return self.master
     
     '''
-    Loads previously saved hand data and creates frames for it.
+    Staged startup. The constructor only builds the widgets, so the window
+    and input section show up right away. Then each step here runs in its own
+    event loop turn, with the status saying how far along it is. Hands are
+    read on the task thread, and the viewer only draws the rows in view, so
+    how long this takes doesn't depend on how many hands are saved.
+    '''
+    def __start_up(self, step=0):
+        steps = (("Preparing tiles...", self.tiles.preload),
+                 ("Loading hands...", self._load_hands),
+                 (None, self._update_perf))
+        text, func = steps[step]
+        if text is not None:
+            self.addStatText.set("Starting up ({}/{}): {}".format(
+                                 step + 1, len(steps) - 1, text))
+        # end if
+        func()
+        if step + 1 < len(steps):
+            self.master.after(1, self.__start_up, step + 1)
+        # end if
+    # end def
+    
+    '''
+    Loads the newest page of previously saved hand data and creates frames for
+    it. Older pages are read in as the viewer gets scrolled up to them. Reading
+    happens on the task thread, the viewer gets filled once it's done.
     '''
     def _load_hands(self):
-        try:
-            print("Loading hands...")
-            with open(self.sf, 'r') as f:
-                data = json.load(f)
-            self.handViewer.import_hands(data, self.tiles)
-            print("Hands loaded.")
-        except FileNotFoundError:
-            Path.mkdir("Data", exist_ok=True)
-            open(self.sf, 'w').close()
-            print("Save file not found. Intialized save file and directory.")
+        if not self.__start_io("Loading hands..."):
+            return
+        self.loading = True
+        self.tasks.submit(self._read_first_page, done=self._show_first_page,
+                          error=self._io_failed)
+        self.__fill_similar()
+    # end def
+    
+    # Queue up filling a new similar hand search with every saved hand. Hands
+    # added from here on aren't in what it reads, so they get noted to add
+    # once it's done.
+    def __fill_similar(self):
+        if self.similar is None:
+            return
+        added = self.similarAdded = []
+        self.tasks.submit(self._read_similar,
+                          done=lambda similar: self.__swap_similar(added,
+                                                                   similar),
+                          error=self.__similar_failed)
+    # end def
+    
+    # Read every saved hand into a new search, runs on the task thread
+    @timed("app.read_similar")
+    def _read_similar(self):
+        from Util.Similar import SimilarHands
+        similar = SimilarHands()
+        similar.extend(self.store.load())
+        return similar
+    # end def
+    
+    # Put the filled search in use, unless another one was started since
+    def __swap_similar(self, added, similar):
+        if added is not self.similarAdded:
+            return
+        similar.extend(added)
+        self.similar = similar
+        self.similarAdded = None
+        self._find_similar({"hand", "start"})
+    # end def
+    
+    # Filling the search hit an error on the task thread
+    def __similar_failed(self, exc):
+        traceback.print_exception(exc)
+        self.similarAdded = None
+        self.similarFrame.show_text("Couldn't read the saved hands to "
+                                    "compare: " + str(exc))
+    # end def
+    
+    # Start paging through the store, runs on the task thread
+    @timed("app.load_hands")
+    def _read_first_page(self):
+        pages = self.store.pages(PAGE_SIZE)
+        return pages, next(pages, [])
+    # end def
+    
+    # Put the newest page in the viewer
+    def _show_first_page(self, result):
+        self.pages, page = result
+        self.rest = None
+        self.pageQueued = False
+        self.loading = False
+        # Hands added during the read weren't saved in time to be in it
+        self.handViewer.import_hands(page + self.unseen, self.tiles)
+        self.unseen = []
+        self.handViewer.scroll_to_end()
+        self.__finish_io("Hands loaded.")
     # end def
     
     '''
-    Save all loaded hands as JSON list. Overwrites the current save.
+    Binded to the viewer nearing the top of the loaded hands. Queues up a read
+    of the next page of older hands, so a burst of scrolling only reads one
+    page at a time. Once the older hands have all been read for an export,
+    pages come straight from those instead.
+    '''
+    def _load_older(self):
+        if self.rest:
+            page = self.rest[-PAGE_SIZE:]
+            del self.rest[-PAGE_SIZE:]
+            self.handViewer.prepend_hands(page, self.tiles)
+        elif self.pages is not None and not self.pageQueued:
+            self.pageQueued = True
+            pages = self.pages
+            self.tasks.submit(self._read_page, pages,
+                              done=lambda page: self._show_page(pages, page),
+                              error=self._io_failed)
+        # end if
+    # end def
+    
+    # Read the next page of older hands, runs on the task thread
+    @timed("app.load_page")
+    def _read_page(self, pages):
+        return next(pages, None)
+    
+    # Put a page of older hands in the viewer, unless it's from before a reload
+    def _show_page(self, pages, page):
+        if pages is not self.pages:
+            return
+        self.pageQueued = False
+        if page is None:
+            self.pages = None
+        else:
+            self.handViewer.prepend_hands(page, self.tiles)
+        # end if
+    # end def
+    
+    '''
+    Export every hand to done, oldest first, including the older ones that
+    haven't been loaded into the viewer. Any pages not read yet are read on
+    the task thread, done gets called back on the main thread once they are.
+    They're kept to hand out as the viewer scrolls up, rather than all put
+    in the viewer at once, which would hold up the window on a big save.
+    '''
+    def _export_hands(self, done, error):
+        if self.pages is None:
+            done(self._unshown() + self.handViewer.export_hands())
+            return
+        # end if
+        pages = self.pages
+        self.tasks.submit(self._read_rest, pages,
+                          done=lambda older: self.__export_loaded(pages, older,
+                                                                  done, error),
+                          error=error)
+    # end def
+    
+    # Keep the older hands that were read, then hand everything to done
+    def __export_loaded(self, pages, older, done, error):
+        if pages is not self.pages:
+            # Reloaded while reading, go again with the new pages
+            self._export_hands(done, error)
+            return
+        # end if
+        self.__keep_rest(older)
+        done(self._unshown() + self.handViewer.export_hands())
+    # end def
+    
+    '''
+    Export every hand right away, for when the app is closing. Waits on
+    anything running on the task thread, as the pages can only be read from
+    one place at once.
+    '''
+    def _export_now(self):
+        self.tasks.wait()
+        if self.pages is not None:
+            self.__keep_rest(self._read_rest(self.pages))
+        # end if
+        return self._unshown() + self.handViewer.export_hands()
+    # end def
+    
+    # Hold on to every older hand once the pages have all been read
+    def __keep_rest(self, older):
+        self.rest = older
+        self.pages = None
+        self.pageQueued = False
+    # end def
+    
+    # Older hands that have been read but aren't in the viewer, oldest first
+    def _unshown(self):
+        return self.rest or []
+    
+    # Every hand left in the pages, oldest first
+    def _read_rest(self, pages):
+        older = [hand for page in pages for hand in reversed(page)]
+        return older[::-1]
+    # end def
+    
+    '''
+    Make sure all loaded hands are saved. How much gets written depends on
+    the store, a JsonStore overwrites the whole save. The writing happens on
+    the task thread, the hands it needs get gathered up here first since the
+    viewer can only be touched from the main thread.
     '''
     def _save_hands(self):
-        print("Writing loaded hands to " + self.sf + "...")
-        handData = self.handViewer.export_hands()
-        with open(self.sf, 'w') as f:
-            json.dump(handData, f, indent=4)
-        # end with
-        print("Write complete.")
+        if not self.__start_io("Saving hands to " + self.store.path + "..."):
+            return
+        # Hands added just before are still being written on the task
+        # thread, so what needs saving gets checked there after them
+        self.tasks.submit(self._save_state, done=self.__save_checked,
+                          error=self._io_failed)
+    # end def
+    
+    # Whether the store has anything new and needs the hands exported, runs
+    # on the task thread
+    def _save_state(self):
+        return self.store.dirty, self.store.needs_export()
+    
+    # Gather up the hands the save needs, if there's anything to save
+    def __save_checked(self, state):
+        dirty, export = state
+        if not (dirty or export):
+            self.__finish_io("Nothing new to save.")
+            return
+        # end if
+        if export and self.pages is not None:
+            # Pages not read in yet have to be, so they're in the rewrite
+            self.tasks.submit(self._read_rest, self.pages,
+                              done=lambda older: self._save_loaded(export,
+                                                                   older),
+                              error=self._io_failed)
+        else:
+            self._save_loaded(export, None)
+        # end if
+    # end def
+    
+    # Keep any older hands that were read, then write the save
+    def _save_loaded(self, export, older):
+        if older is not None:
+            self.__keep_rest(older)
+        # end if
+        hands = None
+        if export:
+            hands = self._unshown() + self.handViewer.export_hands()
+        # end if
+        self.tasks.submit(self._write_save, hands,
+                          done=lambda _: self.__finish_io("Write complete."),
+                          error=self._io_failed)
+    # end def
+    
+    # Save with the exported hands, runs on the task thread
+    @timed("app.save_hands")
+    def _write_save(self, hands):
+        if hands is None and self.store.needs_export():
+            # Hands added since the check tipped the store into a rewrite,
+            # which the next save will do with them exported
+            return
+        self.store.save(lambda: hands)
+    # end def
+    
+    '''
+    Note that a load or save has started, turning off the Save and Reload
+    buttons until it's done. Gives False if one is already running.
+    '''
+    def __start_io(self, text):
+        if self.ioBusy:
+            return False
+        self.ioBusy = True
+        self.saveButton.configure(state='disabled')
+        self.reloadButton.configure(state='disabled')
+        self.addStatText.set(text)
+        print(text)
+        return True
+    # end def
+    
+    # Note that the running load or save is done
+    def __finish_io(self, text):
+        self.ioBusy = False
+        self.saveButton.configure(state='normal')
+        self.reloadButton.configure(state='normal')
+        self.addStatText.set(text)
+        print(text)
+    # end def
+    
+    # A load or save hit an error on the task thread
+    def _io_failed(self, exc):
+        traceback.print_exception(exc)
+        self.pageQueued = False
+        self.loading = False
+        self.__finish_io("Couldn't access " + self.store.path + ": "
+                         + str(exc))
     # end def
     
     '''
@@ -121,8 +477,244 @@ class MahjongTracker:
         for inp, key in rawData:
             handData[key] = inp
         # end for
+        # Clicking Add Hand again shouldn't save the same hand twice
+        if self.handViewer.index.has_hand(handData):
+            self.addStatText.set("That hand is already in the list.")
+            return
+        # end if
         
         self.handViewer.add_hand(handData, self.tiles)
+        if self.loading:
+            self.unseen.append(handData)
+        # end if
+        if self.similar is not None:
+            self.similar.add(handData)
+        if self.similarAdded is not None:
+            self.similarAdded.append(handData)
+        # end if
+        self.tasks.submit(self.store.add, handData, error=self._add_failed)
+    # end def
+    
+    # Writing an added hand hit an error on the task thread
+    def _add_failed(self, exc):
+        traceback.print_exception(exc)
+        self.addStatText.set("Couldn't save the new hand: " + str(exc))
+    # end def
+    
+    '''
+    Work out the shanten and accepts of every saved hand and count how many
+    don't match what was entered. Any pages not loaded yet are read on the
+    task thread first, then a slice of hands gets run per event loop turn so
+    the window stays usable on a large history.
+    '''
+    def _analyze_hands(self):
+        if self.analysis is not None:
+            return
+        self.analysis = False   # Still gathering the hands
+        self.addStatText.set("Reading hands to analyze...")
+        self._export_hands(self.__start_analysis, self.__analysis_failed)
+    # end def
+    
+    # Start going through the exported hands
+    def __start_analysis(self, hands):
+        self.analysis = (hands, batch_ukeire(hands, self.analyzed), [0, 0])
+        self._analyze_step()
+    # end def
+    
+    # Reading the hands to analyze hit an error on the task thread
+    def __analysis_failed(self, exc):
+        traceback.print_exception(exc)
+        self.analysis = None
+        self.addStatText.set("Couldn't read the hands to analyze: " + str(exc))
+    # end def
+    
+    # Analyze hands for up to ANALYZE_SLICE seconds, then yield to Tk
+    def _analyze_step(self):
+        hands, results, diffs = self.analysis
+        start = time.perf_counter()
+        for i, result in results:
+            if result is None:
+                continue
+            hand = hands[i]
+            if str(hand["shanten"]) != str(shanten(hand["hand"])):
+                diffs[0] += 1
+            # end if
+            try:
+                counts = parse(hand["accepts"]).counts
+                entered = {j for j, c in enumerate(counts) if c}
+            except MpszError:
+                entered = None
+            # end try
+            if entered != set(result.tiles):
+                diffs[1] += 1
+            # end if
+            if time.perf_counter() - start > ANALYZE_SLICE:
+                self.addStatText.set("Analyzing hands... {}/{}".format(
+                                                        i + 1, len(hands)))
+                self.master.after(1, self._analyze_step)
+                return
+            # end if
+        # end for
+        self.analysis = None
+        self.addStatText.set("Checked {} hands: {} with different shanten, "
+                             "{} with different accepts.".format(len(hands),
+                                                                 *diffs))
+    # end def
+    
+    '''
+    Open a window with the statistics report over every saved hand. The
+    hands are read and the report worked out on the task thread, the window
+    opens once it's ready. The stats need NumPy, so without it the status
+    just says so.
+    '''
+    def _show_stats(self):
+        try:
+            from Util.Stats import HandStats
+        except ImportError:
+            self.addStatText.set("Stats need NumPy to be installed.")
+            return
+        # end try
+        self.addStatText.set("Working out stats...")
+        self._export_hands(lambda hands: self.tasks.submit(
+                                self.__stats_report, HandStats, hands,
+                                done=self.__open_stats,
+                                error=self.__stats_failed),
+                           self.__stats_failed)
+    # end def
+    
+    # Work out the report, runs on the task thread
+    def __stats_report(self, stats, hands):
+        return stats(hands).report()
+    
+    # Open the window with the finished report
+    def __open_stats(self, report):
+        self.addStatText.set("Stats ready.")
+        window = tk.Toplevel(self.master, bg=self.bg)
+        window.title("MahjongTracker Stats")
+        text = tk.Text(window, font=('Courier', 12), width=60, height=40)
+        text.insert('1.0', report)
+        text.configure(state='disabled')
+        text.pack(fill='both', expand=1)
+    # end def
+    
+    # Reading the hands or working out the stats hit an error
+    def __stats_failed(self, exc):
+        traceback.print_exception(exc)
+        self.addStatText.set("Couldn't work out the stats: " + str(exc))
+    # end def
+    
+    '''
+    Binded to the input section's checks after typing. Looks up the saved
+    hands closest to whatever valid final and dealt hand has been entered.
+    '''
+    @timed("app.find_similar")
+    def _find_similar(self, changed):
+        if self.similar is None or not changed & {"hand", "start"}:
+            return
+        hand = self.inputFrame.checked("hand")
+        start = self.inputFrame.checked("start")
+        if hand is None and start is None:
+            self.similarFrame.show_text("Type a hand or dealt hand to see "
+                                        "similar ones.")
+            return
+        # end if
+        self.similarFrame.show(self.similar.query(hand, start,
+                                                  SIMILAR_COUNT))
+    # end def
+    
+    '''
+    Binded to clicks on a hand. Estimates how often its dealt hand gets to
+    tenpai and wins by tsumo, see Util.Simulate. Hands already simulated show
+    straight away, otherwise the simulation runs on other processes and gets
+    checked on every SIM_POLL milliseconds.
+    '''
+    def _simulate_hand(self, record):
+        result = self.simulator.cached(record)
+        if result is not None:
+            self.__show_simulation(record, result)
+            return
+        # end if
+        try:
+            self.simJob = self.simulator.submit(record)
+        except ValueError:
+            # Not MPSZ (MpszError is a ValueError) or not 13 or 14 tiles
+            self.simJob = None
+            self.addStatText.set("Can't simulate a hand without a valid 13 "
+                                 "or 14 tile starting hand.")
+            return
+        # end try
+        self.addStatText.set("Simulating " + record.start + "...")
+        self.master.after(SIM_POLL, self._check_simulation, self.simJob,
+                          record)
+    # end def
+    
+    # Show a simulation once it's done, unless another hand got clicked since
+    def _check_simulation(self, job, record):
+        if job is not self.simJob:
+            return
+        if not job.done():
+            self.master.after(SIM_POLL, self._check_simulation, job, record)
+            return
+        # end if
+        self.simJob = None
+        try:
+            result = job.result()
+        except Exception as exc:
+            traceback.print_exception(exc)
+            self.addStatText.set("Simulation failed: " + str(exc))
+            return
+        # end try
+        self.__show_simulation(record, result)
+    # end def
+    
+    # Put a simulation's result in the status
+    def __show_simulation(self, record, result):
+        self.addStatText.set("Dealt {} reaches tenpai {:.0%} and wins by "
+                             "tsumo {:.0%} of {} runs (ron isn't simulated)."
+                             .format(record.start, result.tenpai_rate(),
+                                     result.tsumo_rate(), result.trials))
+    # end def
+    
+    '''
+    Binded to edits of the filter bar. Shows only the loaded hands matching
+    it, with the label turning red while the query can't be understood (such
+    as partway through typing a term).
+    '''
+    def _filter_hands(self, *args):
+        try:
+            self.handViewer.filter_hands(self.filterText.get())
+        except QueryError:
+            self.filterLabel['foreground'] = "red"
+            return
+        # end try
+        self.filterLabel['foreground'] = "black"
+        if self.handViewer.query:
+            self.addStatText.set("{} of {} loaded hands match.".format(
+                                 self.handViewer.shown_count(),
+                                 self.handViewer.index.size))
+        else:
+            self.addStatText.set('')
+        # end if
+    # end def
+    
+    '''
+    Show the slowest timings so far in the control frame, then check back in
+    after PERF_REFRESH milliseconds.
+    '''
+    def _update_perf(self):
+        self.perfText.set(Instrument.report(limit=8))
+        self.master.after(PERF_REFRESH, self._update_perf)
+    # end def
+    
+    '''
+    Step to the next tile scale in ZOOMS and redraw the hands with it. Tiles
+    at each scale are only loaded the first time they're shown.
+    '''
+    def _cycle_zoom(self):
+        self.zoom = (self.zoom + 1) % len(ZOOMS)
+        self.tiles = self.tiles.at_scale(ZOOMS[self.zoom])
+        self.handViewer.set_tiles(self.tiles)
+        self.inputFrame.set_tiles(self.tiles)
     # end def
     
     '''
@@ -139,23 +731,57 @@ class MahjongTracker:
         self.quitButton.pack(fill='both', side='top', expand=0)
         self.saveButton.pack(fill='both', side='top', expand=0)
         self.reloadButton.pack(fill='both', side='top', expand=0)
+        self.zoomButton.pack(fill='both', side='top', expand=0)
+        self.analyzeButton.pack(fill='both', side='top', expand=0)
+        self.statsButton.pack(fill='both', side='top', expand=0)
+        self.filterLabel.pack(fill='x', side='top', expand=0, pady=(10,0))
+        self.filterInput.pack(fill='x', side='top', expand=0, padx=5)
         self.addButton.pack(fill='both', side='bottom', expand=0, pady=(0,5))
+        self.addStatus.pack(fill='x', side='bottom', expand=0)
+        self.perfStatus.pack(fill='x', side='bottom', expand=0)
         
         self.inputFrame.get_frame().grid(row=8, column=0, rowspan=2,
-                                         columnspan=11, sticky='news')
+                                         columnspan=8, sticky='news')
+        self.similarFrame.get_frame().grid(row=8, column=8, rowspan=2,
+                                           columnspan=3, sticky='news')
     # end def
     
+    '''
+    Save and close. The last save is done right here rather than on the task
+    thread, after anything already running there has finished, so it's on
+    disk before the window goes away.
+    '''
     def _exit_app(self):
         print("Saving hands and exiting app...")
-        self._save_hands()
+        self.tasks.wait()
+        hands = self._export_now() if self.store.needs_export() else None
+        self._write_save(hands)
+        self.tasks.shutdown()
+        self.simulator.close()
+        self.store.close()
         self.master.destroy()
+    # end def
     
 #end class
     
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MahjongTracker")
+    # The save file's extension picks the store: .json for a plain JSON
+    # list, .jsonl for a JSON snapshot plus journal, .db for SQLite, .mja
+    # for a binary archive, .shards for a folder of monthly shards
+    parser.add_argument("save", nargs='?', default="Data/saved_hands.shards",
+                        help="save file (default: %(default)s)")
+    parser.add_argument("--log", help="also write each timing to this file")
+    parser.add_argument("--profile", metavar="FOLDER",
+                        help="profile this session with cProfile and "
+                             "tracemalloc, writing the results to FOLDER")
+    args = parser.parse_args()
+    if args.log:
+        Instrument.start_log(args.log)
+    if args.profile:
+        Instrument.start_profile()
     try:
         # Initialize and set up the root window
-        SAVE_FILE = "Data/saved_hands.json"
         root = tk.Tk()
         root.title("MahjongTracker")
         root.configure(background='gray66')
@@ -163,11 +789,16 @@ if __name__ == "__main__":
         # Have the columns and rows for the hand viewer expand
         [root.grid_rowconfigure(i, weight=1) for i in range(8)]
         [root.grid_columnconfigure(i, weight=1) for i in range(12)]
-        app = MahjongTracker(root, gen_img_table(10), SAVE_FILE)
+        app = MahjongTracker(root, TileProvider(ZOOMS[0]),
+                             open_store(args.save))
         root.mainloop()
     except Exception:
         # This T/E makes errors while running in the IDE much more tolerable
         print(traceback.format_exc())
         root.destroy()
+    finally:
+        if args.profile:
+            Instrument.stop_profile(args.profile)
+        Instrument.stop_log()
+    # end try
 #end if
-